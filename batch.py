@@ -0,0 +1,143 @@
+"""
+Headless batch runner: replay a saved recipe over many files.
+
+    python batch.py recipe.json "data/*.csv" more_data/ -o processed --format parquet --workers 8
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from frame_utils import enhanced_sanitize_dataframe_for_streamlit, safe_excel_export, safe_columnar_export
+from ingest import compact_dataframe, file_format, read_dataset
+from recipe import recipe_from_json, run_recipe
+
+INPUT_EXTENSIONS = (".csv", ".xlsx", ".xls", ".parquet", ".pq", ".feather", ".arrow", ".ipc")
+OUTPUT_FORMATS = ("parquet", "feather", "csv", "xlsx")
+
+logger = logging.getLogger("easy_analytics.batch")
+
+
+def expand_inputs(patterns):
+    """Resolve files, directories and glob patterns into a sorted list of dataset files."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern, recursive=True) or [pattern]
+        paths.extend(
+            path for path in candidates
+            if os.path.isfile(path) and path.lower().endswith(INPUT_EXTENSIONS)
+        )
+    return sorted(set(paths))
+
+
+def output_names(paths):
+    """One output base name per input, disambiguating equal file stems."""
+    names, used = {}, {}
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        count = used.get(stem, 0)
+        used[stem] = count + 1
+        names[path] = stem if count == 0 else f"{stem}_{count}"
+    return names
+
+
+def encode_output(df, fmt, compression):
+    """Serialize df, returning the bytes and the extension actually produced."""
+    if fmt == "csv":
+        return df.to_csv(index=False).encode("utf-8"), "csv"
+    if fmt == "xlsx":
+        data, file_type, _ = safe_excel_export(df)
+        return data, file_type
+    data, file_type, _ = safe_columnar_export(df, fmt=fmt, compression=compression)
+    return data, file_type
+
+
+def process_file(path, steps, output_dir, name, fmt="parquet", compression="zstd", compact=False, streaming=False):
+    """Read one input, replay the recipe and write the result; runs in a worker process."""
+    started = time.perf_counter()
+    # Columnar files are memory-mapped straight from disk
+    if file_format(path) in ("parquet", "arrow"):
+        df = read_dataset(path, path)
+    else:
+        with open(path, "rb") as source:
+            df = read_dataset(source, path, streaming=streaming)
+    df = enhanced_sanitize_dataframe_for_streamlit(df)
+    if compact:
+        df, _ = compact_dataframe(df)
+    rows_in = len(df)
+    df = run_recipe(df, steps)
+    data, extension = encode_output(df, fmt, compression)
+    output = os.path.join(output_dir, f"{name}.{extension}")
+    with open(output, "wb") as fh:
+        fh.write(data)
+    return {
+        "input": path,
+        "output": output,
+        "rows_in": rows_in,
+        "rows_out": len(df),
+        "columns": df.shape[1],
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def run_batch(steps, paths, output_dir, fmt="parquet", compression="zstd", workers=None,
+              compact=False, streaming=False):
+    """Fan the inputs out over a process pool; returns (results, failures)."""
+    os.makedirs(output_dir, exist_ok=True)
+    names = output_names(paths)
+    results, failures = [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(process_file, path, steps, output_dir, names[path], fmt, compression, compact, streaming): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+                results.append(result)
+                logger.info("%s -> %s (%d rows, %.2fs)", path, result["output"], result["rows_out"], result["seconds"])
+            except Exception as e:
+                failures.append({"input": path, "error": str(e)})
+                logger.error("%s failed: %s", path, e)
+    return results, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay an Easy Analytics recipe over many dataset files.")
+    parser.add_argument("recipe", help="recipe JSON downloaded from the cleaning/transform pages")
+    parser.add_argument("inputs", nargs="+", help="files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", required=True)
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="parquet")
+    parser.add_argument("--compression", default="zstd", help="Parquet/Feather compression codec, or none")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--compact", action="store_true", help="compact dtypes after reading, as on upload")
+    parser.add_argument("--streaming", action="store_true", help="read CSV inputs in chunks")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    with open(args.recipe, encoding="utf-8") as fh:
+        steps = recipe_from_json(fh.read())
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        logger.error("No input files matched %s", args.inputs)
+        return 2
+
+    logger.info("Replaying %d steps over %d files", len(steps), len(paths))
+    results, failures = run_batch(
+        steps, paths, args.output_dir, fmt=args.format,
+        compression=None if args.compression == "none" else args.compression,
+        workers=args.workers, compact=args.compact, streaming=args.streaming,
+    )
+    logger.info("Done: %d succeeded, %d failed", len(results), len(failures))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""
+Reproducible benchmarks of every operation over synthetic datasets.
+
+    python benchmark.py -o baseline.json --sizes 10k,100k --shapes narrow,wide
+    python benchmark.py -o after.json --compare baseline.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import perf
+from frame_utils import enhanced_sanitize_dataframe_for_streamlit, safe_excel_export
+from recipe import OP_MAPS, make_step, apply_step
+
+BENCHMARK_FORMAT = 1
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+# Repetitions of the mixed-dtype column block per frame shape
+SHAPES = {"narrow": 1, "wide": 8}
+EXCEL_MAX_ROWS = 1_048_575
+
+# Parameters for ops that cannot run on their defaults; the rest run on all columns as in the app
+OP_PARAMS = {
+    ("transform", "Create Custom Column"): {"col1": "amount", "col2": "quantity", "operation": "*", "new_col": "total"},
+    ("transform", "Convert String Integers to Int"): {"columns": ["code"]},
+}
+
+CHART_PARAMS = {
+    "Line": {"x": "seq", "y": "amount"},
+    "Bar": {"x": "segment", "y": "amount"},
+    "Histogram": {"x": "amount"},
+    "Box": {"x": "segment", "y": "amount"},
+    "Scatter": {"x": "amount", "y": "score"},
+    "Pie": {"names": "segment", "values": "quantity"},
+    "Heatmap": {},
+    "Area": {"x": "seq", "y": "amount"},
+    "Violin": {"x": "segment", "y": "amount"},
+    "Strip": {"x": "segment", "y": "amount"},
+    "Sunburst": {"path": ["segment", "region"], "values": "quantity"},
+    "Treemap": {"path": ["segment", "region"], "values": "quantity"},
+    "Funnel": {"x": "quantity", "y": "segment"},
+}
+
+logger = logging.getLogger("easy_analytics.benchmark")
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text in SIZES:
+        return SIZES[text]
+    return int(float(text))
+
+
+def size_label(rows):
+    for label, value in SIZES.items():
+        if value == rows:
+            return label
+    return str(rows)
+
+
+def _with_nulls(values, rng, null_ratio):
+    series = pd.Series(values)
+    if null_ratio:
+        series = series.mask(rng.random(len(series)) < null_ratio)
+    return series
+
+
+def make_frame(rows, shape="narrow", null_ratio=0.05, seed=0):
+    """
+    Deterministic frame mixing the dtypes users upload: numbers with and
+    without nulls, low and high cardinality strings, untrimmed text, numeric
+    and date strings, datetimes and booleans. Wide frames repeat the block.
+    """
+    rng = np.random.default_rng(seed)
+    segments = np.array(["retail", "wholesale", "online", "partner", "internal"], dtype=object)
+    regions = np.array(["north", "south", "east", "west"], dtype=object)
+    words = np.array([" Alpha", "beta ", " GAMMA ", "Delta", "epsilon"], dtype=object)
+    days = pd.date_range("2020-01-01", periods=730, freq="D")
+    day_strings = np.array(days.strftime("%Y-%m-%d"), dtype=object)
+
+    block = {
+        "seq": np.arange(rows),
+        "amount": _with_nulls(rng.gamma(2.0, 50.0, rows), rng, null_ratio),
+        "score": rng.normal(size=rows),
+        "quantity": rng.integers(1, 100, rows),
+        "segment": segments[rng.integers(0, len(segments), rows)],
+        "region": _with_nulls(regions[rng.integers(0, len(regions), rows)], rng, null_ratio),
+        "customer": "cust_" + pd.Series(rng.integers(0, max(rows // 2, 1), rows)).astype(str),
+        "note": _with_nulls(words[rng.integers(0, len(words), rows)], rng, null_ratio),
+        "code": pd.Series(rng.integers(0, 10_000, rows)).astype(str).astype(object),
+        "order_date": day_strings[rng.integers(0, len(day_strings), rows)],
+        "shipped_at": days[rng.integers(0, len(days), rows)],
+        "active": rng.random(rows) < 0.5,
+    }
+    columns = {}
+    for repeat in range(SHAPES[shape]):
+        suffix = "" if repeat == 0 else f"_{repeat}"
+        for name, values in block.items():
+            columns[name + suffix] = np.asarray(values)
+    return pd.DataFrame(columns)
+
+
+def op_cases():
+    """(case, kind, name, func) for every entry of OP_MAP1 and OP_MAP2."""
+    cases = []
+    for kind, op_map in OP_MAPS.items():
+        for group, ops in op_map.items():
+            for op in ops:
+                params = OP_PARAMS.get((kind, op.strip()), {})
+                step = make_step(kind, group, op, **params)
+                cases.append((f"{kind}/{group}/{op.strip()}", "op", op.strip(), lambda df, step=step: apply_step(df, step)))
+    return cases
+
+
+def chart_cases():
+    from data_visualization import create_chart
+    return [
+        (f"chart/{chart_type}", "chart", chart_type, lambda df, c=chart_type, p=params: create_chart(df, c, p))
+        for chart_type, params in CHART_PARAMS.items()
+    ]
+
+
+def all_cases():
+    cases = [
+        # A shallow copy defeats the clean-schema fast path so each run does the full pass
+        ("sanitize", "sanitize", "enhanced_sanitize_dataframe_for_streamlit",
+         lambda df: enhanced_sanitize_dataframe_for_streamlit(df.copy(deep=False))),
+        ("export/excel", "export", "safe_excel_export", lambda df: safe_excel_export(df)),
+    ]
+    return cases + op_cases() + chart_cases()
+
+
+def _output_size(result):
+    if isinstance(result, pd.DataFrame):
+        return {"output_shape": list(result.shape)}
+    if isinstance(result, tuple) and result and isinstance(result[0], (bytes, bytearray)):
+        return {"output_mb": round(len(result[0]) / 1024 ** 2, 3)}
+    if hasattr(result, "to_json"):
+        # Size of the figure payload that would be sent to the browser
+        return {"output_mb": round(len(result.to_json()) / 1024 ** 2, 3)}
+    return {}
+
+
+def run_case(df, func, repeat, trace_memory):
+    """Time func(df) repeat times; memory is traced on a separate final run when requested."""
+    timings, sanitize = [], []
+    result = None
+    for _ in range(repeat):
+        records = []
+        perf.set_recorder(records, trace_memory=False)
+        # Steps record themselves too; the outermost measurement is appended last
+        with perf.measure("benchmark", "case", df):
+            result = func(df)
+        timings.append(records[-1]["wall_ms"])
+        sanitize.append(records[-1]["sanitize_ms"])
+    entry = {
+        "wall_ms": round(statistics.median(timings), 3),
+        "min_ms": min(timings),
+        "runs_ms": timings,
+        "sanitize_ms": round(statistics.median(sanitize), 3),
+        **_output_size(result),
+    }
+    if trace_memory:
+        records = []
+        perf.set_recorder(records, trace_memory=True)
+        with perf.measure("benchmark", "case", df):
+            func(df)
+        entry["peak_mb"] = records[-1]["peak_mb"]
+    perf.set_recorder(None)
+    return entry
+
+
+def run_benchmarks(sizes, shapes, repeat=3, null_ratio=0.05, seed=0, include=None, exclude=None,
+                   trace_memory=False):
+    results = []
+    cases = all_cases()
+    if include:
+        cases = [case for case in cases if any(pattern in case[0] for pattern in include)]
+    if exclude:
+        cases = [case for case in cases if not any(pattern in case[0] for pattern in exclude)]
+    for rows in sizes:
+        for shape in shapes:
+            dataset = f"{size_label(rows)}-{shape}"
+            started = time.perf_counter()
+            raw = make_frame(rows, shape, null_ratio=null_ratio, seed=seed)
+            # Ops see the frame as the app holds it after upload
+            df = enhanced_sanitize_dataframe_for_streamlit(raw)
+            logger.info("%s: %d x %d generated in %.1fs", dataset, *df.shape, time.perf_counter() - started)
+            for case, kind, name, func in cases:
+                entry = {"dataset": dataset, "rows": rows, "columns": df.shape[1], "case": case, "kind": kind, "name": name}
+                if case == "export/excel" and rows > EXCEL_MAX_ROWS:
+                    entry["skipped"] = "exceeds the Excel row limit"
+                    results.append(entry)
+                    continue
+                try:
+                    entry.update(run_case(raw if kind == "sanitize" else df, func, repeat, trace_memory))
+                    logger.info("%s %s: %.1f ms", dataset, case, entry["wall_ms"])
+                except Exception as e:
+                    entry["error"] = str(e)
+                    logger.warning("%s %s failed: %s", dataset, case, e)
+                results.append(entry)
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold=1.2):
+    """Rows of (dataset, case, baseline ms, current ms, ratio) and whether any case regressed past threshold."""
+    previous = {(entry["dataset"], entry["case"]): entry for entry in baseline["results"]}
+    rows, regressed = [], False
+    for entry in results:
+        before = previous.get((entry["dataset"], entry["case"]))
+        if not before or "wall_ms" not in entry or "wall_ms" not in before:
+            continue
+        ratio = entry["wall_ms"] / before["wall_ms"] if before["wall_ms"] else float("inf")
+        regressed = regressed or ratio > threshold
+        rows.append((entry["dataset"], entry["case"], before["wall_ms"], entry["wall_ms"], ratio))
+    return rows, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Easy Analytics operations on synthetic datasets.")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="where to write the JSON results")
+    parser.add_argument("--sizes", default="10k,100k", help="comma separated row counts, e.g. 10k,100k,1m,10m")
+    parser.add_argument("--shapes", default="narrow,wide", help="comma separated: narrow, wide")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case; the median is reported")
+    parser.add_argument("--null-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--filter", action="append", help="only run cases containing this text (repeatable)")
+    parser.add_argument("--exclude", action="append", help="skip cases containing this text (repeatable)")
+    parser.add_argument("--memory", action="store_true", help="also record peak traced memory per case")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    # Deprecation notices from the ops would repeat for every run of every case
+    warnings.simplefilter("ignore", FutureWarning)
+    shapes = [shape.strip() for shape in args.shapes.split(",") if shape.strip()]
+    unknown = [shape for shape in shapes if shape not in SHAPES]
+    if unknown:
+        parser.error(f"unknown shapes: {', '.join(unknown)}")
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+
+    results = run_benchmarks(
+        sizes, shapes, repeat=max(args.repeat, 1), null_ratio=args.null_ratio, seed=args.seed,
+        include=args.filter, exclude=args.exclude, trace_memory=args.memory,
+    )
+    report = {
+        "format": BENCHMARK_FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "config": {
+            "sizes": sizes, "shapes": shapes, "repeat": args.repeat,
+            "null_ratio": args.null_ratio, "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    logger.info("Wrote %d results to %s", len(results), args.output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        rows, regressed = compare(results, baseline, args.threshold)
+        print(f"{'dataset':<14} {'case':<70} {'before ms':>11} {'after ms':>11} {'ratio':>7}")
+        for dataset, case, before, after, ratio in rows:
+            flag = "  !" if ratio > args.threshold else ""
+            print(f"{dataset:<14} {case:<70} {before:>11.1f} {after:>11.1f} {ratio:>7.2f}{flag}")
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
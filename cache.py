@@ -0,0 +1,173 @@
+import hashlib
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def content_hash(*parts):
+    """Return a short hex digest for a mix of bytes-like and plain values."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            digest.update(part)
+        else:
+            digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def estimate_size(value):
+    """Rough in-memory size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class BoundedCache:
+    """
+    Thread-safe LRU cache bounded by the total size of its values.
+    When spill_dir is set, entries evicted from memory are pickled to disk
+    and transparently promoted back on the next hit.
+    """
+
+    def __init__(self, max_bytes, spill_dir=None, spill_max_bytes=None, sizeof=estimate_size):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._entries:
+                return True
+        path = self._spill_path(key)
+        return path is not None and os.path.exists(path)
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+        value = self._load_spilled(key)
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self._total -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                evicted.append((key, value))
+            else:
+                self._entries[key] = (value, size)
+                self._total += size
+                while self._total > self.max_bytes:
+                    old_key, (old_value, old_size) = self._entries.popitem(last=False)
+                    self._total -= old_size
+                    evicted.append((old_key, old_value))
+        for old_key, old_value in evicted:
+            self._spill(old_key, old_value)
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                value, size = self._entries.pop(key)
+                self._total -= size
+                return value
+        return default
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total = 0
+
+    def _spill_path(self, key):
+        if not self.spill_dir:
+            return None
+        name = key if isinstance(key, str) and key.isalnum() else content_hash(key)
+        return os.path.join(self.spill_dir, f"{name}.pkl")
+
+    def _spill(self, key, value):
+        path = self._spill_path(key)
+        if path is None or os.path.exists(path):
+            return
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as fh:
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._prune_spill()
+
+    def _load_spilled(self, key):
+        path = self._spill_path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as fh:
+                value = pickle.load(fh)
+            os.utime(path)
+            return value
+        except Exception:
+            return None
+
+    def _prune_spill(self):
+        if not self.spill_max_bytes:
+            return
+        files = []
+        for name in os.listdir(self.spill_dir):
+            if name.endswith(".pkl"):
+                path = os.path.join(self.spill_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.spill_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
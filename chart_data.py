@@ -0,0 +1,355 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Points sent to the browser per chart before server-side reduction kicks in
+LINE_POINT_BUDGET = 5_000
+SCATTER_POINT_BUDGET = 20_000
+# Line and scatter charts with more points than this are drawn with WebGL traces
+WEBGL_POINT_THRESHOLD = int(os.environ.get("EASY_ANALYTICS_WEBGL_THRESHOLD", "1000"))
+# Cells per axis of the density grid used to sample scatter plots
+SCATTER_GRID = 128
+
+# Mappings that split a line chart into separate traces
+SERIES_PARAMS = ("color", "line_group", "line_dash", "symbol", "facet_col", "facet_row", "animation_frame")
+# Mappings that split aggregated bars and slices into separate marks
+GROUP_PARAMS = ("color", "pattern_shape", "facet_col", "facet_row", "animation_frame", "animation_group")
+HISTOGRAM_MAX_BINS = 200
+# Plotly Express arguments that only make sense on row-level data
+ROW_LEVEL_PARAMS = ("nbins", "histnorm", "histfunc", "cumulative", "marginal", "error_x", "error_y")
+# Column mappings that label single rows; charts using them are drawn unaggregated
+ROW_LABEL_PARAMS = ("hover_name", "hover_data", "text", "custom_data")
+
+
+def _axis_values(series):
+    """Float coordinates for any column: numbers as-is, datetimes as ints, everything else by position."""
+    if pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=float, na_value=np.nan)
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=float, na_value=np.nan)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype="datetime64[ns]")
+        return np.where(np.isnat(values), np.nan, values.view(np.int64).astype(float))
+    return np.arange(len(series), dtype=float)
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: positions of threshold points that keep
+    the visual shape of the (x, y) line. First and last points are always kept.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (threshold - 2)
+    # bounds[i]:bounds[i + 1] is bucket i; the last bound is the final point
+    bounds = np.floor(np.arange(threshold - 1) * every).astype(np.int64) + 1
+    bounds[-1] = n - 1
+    # The average of the following bucket does not depend on earlier picks, so compute them all at once
+    starts = np.append(bounds[1:], n - 1)
+    averages = []
+    for values in (x, y):
+        finite = np.isfinite(values)
+        sums = np.add.reduceat(np.where(finite, values, 0.0), starts)
+        counts = np.add.reduceat(finite.astype(np.int64), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages.append(sums / counts)
+    avg_x, avg_y = averages
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        with np.errstate(invalid="ignore"):
+            area = np.abs((x[a] - avg_x[i]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y[i] - y[a]))
+        a = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        selected[i + 1] = a
+    return selected
+
+
+def _grid_cells(values, grid):
+    """Bin index per value on a grid spanning its range; missing values get their own bin."""
+    finite = np.isfinite(values)
+    cells = np.full(len(values), grid, dtype=np.int64)
+    if finite.any():
+        low, high = values[finite].min(), values[finite].max()
+        scale = grid / (high - low) if high > low else 0.0
+        cells[finite] = np.minimum(((values[finite] - low) * scale).astype(np.int64), grid - 1)
+    return cells
+
+
+def density_sample_indices(x, y, budget, grid=SCATTER_GRID, seed=0):
+    """
+    Sorted positions of about budget points, capping how many are kept per
+    grid cell so dense regions are thinned while sparse ones and outliers stay.
+    """
+    n = len(x)
+    if n <= budget:
+        return np.arange(n)
+    cells = _grid_cells(np.asarray(x, dtype=float), grid) * (grid + 1) + _grid_cells(np.asarray(y, dtype=float), grid)
+    _, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+
+    # Smallest per-cell cap that still fills the budget
+    low, high = 1, int(counts.max())
+    while low < high:
+        cap = (low + high) // 2
+        if np.minimum(counts, cap).sum() >= budget:
+            high = cap
+        else:
+            low = cap + 1
+
+    # A stable sort of a random permutation by cell leaves each cell's points in random order
+    shuffled = np.random.default_rng(seed).permutation(n)
+    order = shuffled[np.argsort(inverse[shuffled], kind="stable")]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - np.repeat(starts, counts)
+    return np.flatnonzero(rank < low)
+
+
+def _series_groups(df, params):
+    keys = [params[name] for name in SERIES_PARAMS if params.get(name) in df.columns]
+    if not keys:
+        return [np.arange(len(df))]
+    return list(df.groupby(list(dict.fromkeys(keys)), sort=False, dropna=False, observed=True).indices.values())
+
+
+def _shared_x_positions(df, x_values, y_values, budget):
+    """
+    Rows at the x values LTTB picks from the per-x sum over all traces, so
+    stacked traces keep the same x values and stack on real points.
+    """
+    codes, uniques = pd.factorize(x_values, sort=True)
+    totals = np.bincount(codes[codes >= 0], weights=np.nan_to_num(y_values[codes >= 0]), minlength=len(uniques))
+    share = max(3, int(budget * len(uniques) / len(df)))
+    chosen = np.zeros(len(uniques) + 1, dtype=bool)
+    chosen[lttb_indices(np.asarray(uniques, dtype=float), totals, share)] = True
+    # Rows with a missing x (code -1) land on the last slot and are dropped like unchosen ones
+    return np.flatnonzero(chosen[codes])
+
+
+def downsample_line(df, x, y, budget, params, shared_x=False):
+    """
+    LTTB per trace, with each trace's share of the budget proportional to its
+    length. With shared_x (stacked areas) the x values are picked once for all traces.
+    """
+    n = len(df)
+    x_values = _axis_values(df[x]) if x in df.columns else np.arange(n, dtype=float)
+    y_values = _axis_values(df[y])
+    if shared_x and x in df.columns and len(_series_groups(df, params)) > 1:
+        return df.iloc[_shared_x_positions(df, x_values, y_values, budget)]
+    keep = []
+    for positions in _series_groups(df, params):
+        share = max(3, int(budget * len(positions) / n))
+        keep.append(positions[lttb_indices(x_values[positions], y_values[positions], share)])
+    return df.iloc[np.sort(np.concatenate(keep))]
+
+
+def downsample_scatter(df, x, y, budget):
+    return df.iloc[density_sample_indices(_axis_values(df[x]), _axis_values(df[y]), budget)]
+
+
+def reduce_points(df, chart_type, params, line_budget=LINE_POINT_BUDGET, scatter_budget=SCATTER_POINT_BUDGET):
+    """
+    Rows to plot for line, area and scatter charts within the point budget.
+    Returns the frame and a note describing the reduction, or None if nothing was dropped.
+    """
+    x, y = params.get("x"), params.get("y")
+    if y not in df.columns:
+        return df, None
+    if chart_type in ("Line", "Area") and len(df) > line_budget:
+        reduced = downsample_line(df, x, y, line_budget, params, shared_x=chart_type == "Area")
+        method = "LTTB downsampling"
+    elif chart_type == "Scatter" and len(df) > scatter_budget and x in df.columns:
+        reduced = downsample_scatter(df, x, y, scatter_budget)
+        method = "density-aware sampling"
+    else:
+        return df, None
+    if len(reduced) == len(df):
+        return df, None
+    return reduced, f"Showing {len(reduced):,} of {len(df):,} points ({method})"
+
+
+def render_mode(chart_type, n_points, params, threshold=WEBGL_POINT_THRESHOLD):
+    """
+    Plotly Express render_mode for line and scatter charts: WebGL (scattergl)
+    from threshold points up, SVG below it and where WebGL cannot draw the
+    chart (spline lines, animations). None for chart types without the option.
+    """
+    if chart_type not in ("Line", "Scatter"):
+        return None
+    if params.get("line_shape") == "spline" or params.get("animation_frame"):
+        return "svg"
+    return "webgl" if n_points >= threshold else "svg"
+
+
+def _is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def _group_keys(df, params, exclude=()):
+    keys = []
+    for name in GROUP_PARAMS:
+        col = params.get(name)
+        if col in df.columns and col not in exclude and col not in keys:
+            keys.append(col)
+    return keys
+
+
+def _aggregate_params(params, **overrides):
+    kept = {k: v for k, v in params.items() if k not in ROW_LEVEL_PARAMS}
+    kept.update(overrides)
+    return kept
+
+
+def aggregate_histogram(df, params, max_bins=HISTOGRAM_MAX_BINS):
+    """
+    Bin counts per color/facet group, normalized like histnorm, as a frame for
+    a bar chart with one row per non-empty bin. Returns (frame, params) or None.
+    """
+    x = params.get("x")
+    if x not in df.columns:
+        return None
+    keys = _group_keys(df, params, exclude=(x,))
+    series = df[x]
+    is_datetime = pd.api.types.is_datetime64_any_dtype(series)
+    histnorm = params.get("histnorm")
+    y = histnorm or "count"
+
+    if _is_numeric(series) or is_datetime:
+        values = _axis_values(series)
+        finite = np.isfinite(values)
+        if not finite.any():
+            return None
+        edges = np.histogram_bin_edges(values[finite], bins=params.get("nbins") or "auto")
+        if len(edges) - 1 > max_bins:
+            edges = np.histogram_bin_edges(values[finite], bins=max_bins)
+        bins = np.clip(np.searchsorted(edges, values[finite], side="right") - 1, 0, len(edges) - 2)
+        frame = pd.DataFrame({key: df[key].to_numpy()[finite] for key in keys})
+        frame["_bin"] = bins
+        counts = frame.groupby(keys + ["_bin"], sort=False, dropna=False, observed=True).size().reset_index(name=y)
+        counts = counts.sort_values("_bin", kind="stable")
+        mids = (edges[:-1] + edges[1:]) / 2
+        positions = counts.pop("_bin").to_numpy()
+        counts[x] = pd.to_datetime(mids[positions].astype(np.int64)) if is_datetime else mids[positions]
+        widths = np.diff(edges)[positions]
+    else:
+        counts = df.groupby(keys + [x], sort=False, dropna=True, observed=True).size().reset_index(name=y)
+        widths = np.ones(len(counts))
+
+    if histnorm:
+        # Plotly normalizes each trace on its own
+        totals = counts.groupby(keys, sort=False, dropna=False)[y].transform("sum") if keys else counts[y].sum()
+        if histnorm == "percent":
+            counts[y] = 100 * counts[y] / totals
+        elif histnorm == "probability":
+            counts[y] = counts[y] / totals
+        elif histnorm == "density":
+            counts[y] = counts[y] / widths
+        elif histnorm == "probability density":
+            counts[y] = counts[y] / (totals * widths)
+    return counts, _aggregate_params(params, x=x, y=y)
+
+
+def aggregate_sum(df, category, value, params):
+    """
+    Sum value per category and color/facet group. Error bar columns are
+    combined in quadrature, as for a sum of independent values.
+    """
+    keys = [category] + _group_keys(df, params, exclude=(category,))
+    sums = [value]
+    errors = [params[name] for name in ("error_x", "error_y") if params.get(name) in df.columns and _is_numeric(df[params[name]])]
+    frame = df[list(dict.fromkeys(keys + sums))].copy(deep=False)
+    for col in errors:
+        frame[f"_{col}_sq"] = np.square(df[col].astype(float))
+    grouped = frame.groupby(keys, sort=False, dropna=False, observed=True)
+    result = grouped.sum(min_count=1).reset_index()
+    overrides = {}
+    for name in ("error_x", "error_y"):
+        col = params.get(name)
+        if col in errors:
+            result[col] = np.sqrt(result.pop(f"_{col}_sq"))
+            overrides[name] = col
+    kept = _aggregate_params(params, **overrides)
+    return result, kept
+
+
+def _category_and_value(df, params, horizontal):
+    """Which of x/y is the category axis and which holds the numbers to sum."""
+    x, y = params.get("x"), params.get("y")
+    if x not in df.columns or y not in df.columns or x == y:
+        return None
+    if horizontal and _is_numeric(df[x]):
+        return y, x
+    if _is_numeric(df[y]):
+        return x, y
+    if _is_numeric(df[x]):
+        return y, x
+    return None
+
+
+def aggregate_hierarchy(df, params):
+    """Leaf totals for sunburst/treemap; numeric colors become value-weighted leaf means."""
+    path = [col for col in params.get("path") or [] if col in df.columns]
+    if not path:
+        return None
+    values = params.get("values")
+    if values is not None and (values not in df.columns or not _is_numeric(df[values])):
+        return None
+    color = params.get("color")
+    numeric_color = color in df.columns and color not in path and color != values and _is_numeric(df[color])
+    keys = list(path)
+    if color in df.columns and color not in path and color != values and not numeric_color:
+        keys.append(color)
+
+    frame = pd.DataFrame({key: df[key] for key in keys})
+    weights = df[values].astype(float) if values else pd.Series(1.0, index=df.index)
+    weight_col = values or "count"
+    frame[weight_col] = weights
+    if numeric_color:
+        frame["_weighted"] = df[color].astype(float) * weights
+    result = frame.groupby(keys, sort=False, dropna=False, observed=True).sum().reset_index()
+    if numeric_color:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[color] = result.pop("_weighted") / result[weight_col]
+    return result, _aggregate_params(params, values=weight_col)
+
+
+def pre_aggregate(df, chart_type, params):
+    """
+    Aggregate row-level data for chart types whose marks are sums or counts,
+    so the figure only carries the aggregated values.
+    Returns (frame, params, chart type to draw); inputs come back unchanged when
+    the chart cannot be aggregated.
+    """
+    aggregated = None
+    draw = chart_type
+    if any(params.get(name) is not None for name in ROW_LABEL_PARAMS):
+        return df, params, chart_type
+    if chart_type == "Histogram":
+        aggregated = aggregate_histogram(df, params)
+        draw = "Bar"
+    elif chart_type in ("Bar", "Funnel"):
+        horizontal = params.get("orientation", "h" if chart_type == "Funnel" else "v") == "h"
+        axes = _category_and_value(df, params, horizontal)
+        if axes:
+            aggregated = aggregate_sum(df, *axes, params)
+    elif chart_type == "Pie":
+        names, values = params.get("names"), params.get("values")
+        if names in df.columns and (values is None or (values in df.columns and _is_numeric(df[values]))):
+            if values is None:
+                keys = [names] + _group_keys(df, params, exclude=(names,))
+                frame = pd.DataFrame({key: df[key] for key in keys}).assign(count=1)
+                result, kept = aggregate_sum(frame, names, "count", params)
+                aggregated = result, dict(kept, values="count")
+            else:
+                aggregated = aggregate_sum(df, names, values, params)
+    elif chart_type in ("Sunburst", "Treemap"):
+        aggregated = aggregate_hierarchy(df, params)
+    if aggregated is None:
+        return df, params, chart_type
+    return aggregated[0], aggregated[1], draw
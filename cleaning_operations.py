@@ -1,98 +1,132 @@
 import pandas as pd
-import streamlit as st
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler, StandardScaler
-from utils import enhanced_sanitize_dataframe_for_streamlit
+from frame_utils import enhanced_sanitize_dataframe_for_streamlit, notify
+from null_index import missing_summary, null_counts, null_frame, rows_with_nulls
+from fingerprints import duplicate_groups, duplicated_mask
+from column_stats import column_stat, is_numeric
+from sketches import approximate_nunique, approximate_top_values
+from string_ops import text_columns, transform_string_columns
+from replacement import replace_values
+from type_inference import convert_inferred, failing_rows, infer_types
+from parallel import map_columns
 
 def handle_missing_values(df, method, columns=None):
-    result = df.copy()
-    target_cols = columns if columns else result.columns
+    target_cols = columns if columns else df.columns
 
     if method == "isnull":
-        result = result[target_cols].isnull()
+        result = missing_summary(df, target_cols)
     elif method == "isnull_sum":
-        result = pd.DataFrame(result[target_cols].isnull().sum(), columns=['Missing_Count'])
+        result = pd.DataFrame(null_counts(df, target_cols), columns=['Missing_Count'])
     elif method == "notnull":
-        result = result[target_cols].notnull()
+        result = null_frame(df, target_cols, present=True)
     else:
         result = df
 
     return enhanced_sanitize_dataframe_for_streamlit(result)
 
 def remove_missing_values(df, method='default', **kwargs):
-    if method == 'default':
-        result = df.dropna()
+    if method in ('default', 'all'):
+        missing = rows_with_nulls(df, how='any' if method == 'default' else 'all')
+        result = df[~missing] if missing.any() else df.copy(deep=False)
     elif method == 'axis1':
-        result = df.dropna(axis=1)
-    elif method == 'all':
-        result = df.dropna(how='all')
+        result = df.loc[:, (null_counts(df) == 0).to_numpy()]
     else:
         result = df
 
     return enhanced_sanitize_dataframe_for_streamlit(result)
 
+def remove_duplicates(df, columns=None):
+    duplicated = duplicated_mask(df, columns)
+    result = df[~duplicated] if duplicated.any() else df.copy(deep=False)
+    return enhanced_sanitize_dataframe_for_streamlit(result)
+
+def _fillable_columns(result, target_cols, value):
+    """Register value as a category of the categorical columns about to be filled with it."""
+    for col in target_cols:
+        if isinstance(result[col].dtype, pd.CategoricalDtype) and value not in result[col].cat.categories:
+            result[col] = result[col].cat.add_categories([value])
+    return list(target_cols)
+
 def fill_missing_values(df, method='zero', value=None, columns=None):
-    result = df.copy()
-    target_cols = columns if columns else result.columns
+    result = df.copy(deep=False)
+    # Columns without gaps are left untouched so they keep sharing data with df
+    counts = null_counts(df, columns if columns else None)
+    target_cols = list(counts.index[counts > 0])
+    if not target_cols:
+        return enhanced_sanitize_dataframe_for_streamlit(result)
 
     if method == 'zero':
-        result[target_cols] = result[target_cols].fillna(0)
+        fill_cols = _fillable_columns(result, target_cols, 0)
+        result[fill_cols] = result[fill_cols].fillna(0)
     elif method == 'ffill':
         result[target_cols] = result[target_cols].ffill()
     elif method == 'bfill':
         result[target_cols] = result[target_cols].bfill()
     elif method == 'mean':
-        numeric_cols = result[target_cols].select_dtypes(include=[np.number]).columns
-        for col in numeric_cols:
-            result[col] = result[col].fillna(result[col].mean())
+        numeric_cols = [col for col in target_cols if is_numeric(df, col)]
+        filled = map_columns(lambda df, col: df[col].fillna(column_stat(df, col, "mean")), df, numeric_cols)
+        for col, values in filled.items():
+            result[col] = values
     elif method == 'unknown':
-        result[target_cols] = result[target_cols].fillna("Unknown")
+        fill_cols = _fillable_columns(result, target_cols, "Unknown")
+        result[fill_cols] = result[fill_cols].fillna("Unknown")
 
     return enhanced_sanitize_dataframe_for_streamlit(result)
 
 def string_operations(df, operation, columns=None):
-    result = df.copy()
-    string_cols = columns if columns else df.select_dtypes(include=['object']).columns
+    result = df.copy(deep=False)
+    string_cols = columns if columns else text_columns(df)
 
-    if operation == 'lower':
-        for col in string_cols:
-            result[col] = result[col].astype(str).str.lower()
-    elif operation == 'upper':
-        for col in string_cols:
-            result[col] = result[col].astype(str).str.upper()
-    elif operation == 'strip':
-        for col in string_cols:
-            result[col] = result[col].astype(str).str.strip()
+    for col, values in transform_string_columns(df, operation, string_cols).items():
+        result[col] = values
 
     return enhanced_sanitize_dataframe_for_streamlit(result)
 
 def data_type_operations(df, operation, columns=None):
-    result = df.copy()
-    target_cols = columns if columns else result.columns
+    result = df.copy(deep=False)
 
     if operation == 'fix_numeric':
-        for col in target_cols:
-            if result[col].dtype == 'object':
-                try:
-                    numeric_col = pd.to_numeric(result[col], errors='ignore')
-                    if not numeric_col.equals(result[col]):
-                        result[col] = numeric_col
-                except:
-                    pass
+        # Text columns whose sampled values mostly parse as numbers are converted; stray cells become missing
+        result = convert_inferred(df, columns=columns, kinds=("int", "float"))
 
     return enhanced_sanitize_dataframe_for_streamlit(result)
 
 def categorical_operations(df, operation, columns=None):
-    result = df.copy()
+    result = df.copy(deep=False)
     target_cols = columns if columns else result.columns
 
     if operation == 'to_category':
-        string_cols = result[target_cols].select_dtypes(include=['object']).columns
+        string_cols = result[target_cols].select_dtypes(include=['object', 'string']).columns
         for col in string_cols:
             result[col] = result[col].astype('category')
 
     return enhanced_sanitize_dataframe_for_streamlit(result)
 
+def unique_counts(df, approximate=False):
+    rows = []
+    for col in df.columns:
+        if approximate:
+            estimate, margin = approximate_nunique(df, col)
+            rows.append(f"{col}: ~{estimate} unique (±{margin} at 95%)")
+        else:
+            rows.append(f"{col}: {column_stat(df, col, 'nunique')} unique")
+    return enhanced_sanitize_dataframe_for_streamlit(pd.DataFrame(rows, columns=['Unique_Counts']))
+
+def top_values(df, columns=None, n=10, approximate=False):
+    """Most frequent values per column; approximate counts come as the range the true count lies in."""
+    target_cols = columns if columns else df.columns
+    tables = []
+    for col in target_cols:
+        if approximate:
+            table = approximate_top_values(df, col, n)
+        else:
+            counts = df[col].value_counts().head(n)
+            table = pd.DataFrame({"Value": counts.index, "Count": counts.to_numpy()})
+        table.insert(0, "Column", col)
+        tables.append(table)
+    return enhanced_sanitize_dataframe_for_streamlit(pd.concat(tables, ignore_index=True) if tables else pd.DataFrame())
+
 
 CLEANING_OPS = [
     "Handling Missing Values", "Removing Missing Values", "Filling Missing Values",
@@ -102,10 +136,10 @@ CLEANING_OPS = [
 
 OP_MAP1 = {
    "Handling Missing Values": {
-    "Show Missing Values": lambda df: handle_missing_values(df, "isnull", columns=st.session_state.get("selected_columns", [])),
-    "Count Missing Values": lambda df: handle_missing_values(df, "isnull_sum", columns=st.session_state.get("selected_columns", [])),
-    "Show Non-Missing ": lambda df: handle_missing_values(df, "notnull", columns=st.session_state.get("selected_columns", [])),
-    "Show Missing Values by Column": lambda df: enhanced_sanitize_dataframe_for_streamlit(pd.DataFrame(df.isnull().sum(), columns=['Missing_Count'])),
+    "Show Missing Values": lambda df, columns=None: handle_missing_values(df, "isnull", columns=columns),
+    "Count Missing Values": lambda df, columns=None: handle_missing_values(df, "isnull_sum", columns=columns),
+    "Show Non-Missing ": lambda df, columns=None: handle_missing_values(df, "notnull", columns=columns),
+    "Show Missing Values by Column": lambda df: enhanced_sanitize_dataframe_for_streamlit(pd.DataFrame(null_counts(df), columns=['Missing_Count'])),
     },
     "Removing Missing Values": {
         "Drop All Missing ": lambda df: remove_missing_values(df, 'default'),
@@ -113,15 +147,16 @@ OP_MAP1 = {
         "Drop All-Missing Rows": lambda df: remove_missing_values(df, 'all'),
     },
     "Filling Missing Values": {
-    "Fill with 0": lambda df: fill_missing_values(df, 'zero', columns=st.session_state.get("selected_columns", [])),
-    "Forward Fill": lambda df: fill_missing_values(df, 'ffill', columns=st.session_state.get("selected_columns", [])),
-    "Backward Fill": lambda df: fill_missing_values(df, 'bfill', columns=st.session_state.get("selected_columns", [])),
-    "Fill with Mean": lambda df: fill_missing_values(df, 'mean', columns=st.session_state.get("selected_columns", [])),
-    "Fill with 'Unknown'": lambda df: fill_missing_values(df, 'unknown', columns=st.session_state.get("selected_columns", [])),
+    "Fill with 0": lambda df, columns=None: fill_missing_values(df, 'zero', columns=columns),
+    "Forward Fill": lambda df, columns=None: fill_missing_values(df, 'ffill', columns=columns),
+    "Backward Fill": lambda df, columns=None: fill_missing_values(df, 'bfill', columns=columns),
+    "Fill with Mean": lambda df, columns=None: fill_missing_values(df, 'mean', columns=columns),
+    "Fill with 'Unknown'": lambda df, columns=None: fill_missing_values(df, 'unknown', columns=columns),
     },
     "Removing Duplicates": {
-        "Show Duplicates": lambda df: enhanced_sanitize_dataframe_for_streamlit(df[df.duplicated()]),
-        "Remove Duplicates": lambda df: enhanced_sanitize_dataframe_for_streamlit(df.drop_duplicates()),
+        "Show Duplicates": lambda df, columns=None: enhanced_sanitize_dataframe_for_streamlit(df[duplicated_mask(df, columns)]),
+        "Show Duplicate Groups": lambda df, columns=None: enhanced_sanitize_dataframe_for_streamlit(duplicate_groups(df, columns)),
+        "Remove Duplicates": lambda df, columns=None: remove_duplicates(df, columns=columns),
     },
     "Renaming Columns": {
         "View Current Column Names": lambda df: enhanced_sanitize_dataframe_for_streamlit(pd.DataFrame(list(df.columns), columns=['Column_Names'])),
@@ -129,20 +164,27 @@ OP_MAP1 = {
         "Remove Spaces from Columns": lambda df: enhanced_sanitize_dataframe_for_streamlit(df.rename(columns={col: col.replace(' ', '_') for col in df.columns})),
     },
     "Fixing Data Types": {
-    "Auto-Fix Numeric Types": lambda df: data_type_operations(df, 'fix_numeric', columns=st.session_state.get("selected_columns", [])),
+    "Auto-Fix Numeric Types": lambda df, columns=None: data_type_operations(df, 'fix_numeric', columns=columns),
     "View Data Types": lambda df: enhanced_sanitize_dataframe_for_streamlit(pd.DataFrame(df.dtypes, columns=['Data_Type'])),
+    "Infer Column Types": lambda df, columns=None: enhanced_sanitize_dataframe_for_streamlit(infer_types(df, columns=columns)),
+    "Show Rows Failing Inferred Types": lambda df, columns=None: enhanced_sanitize_dataframe_for_streamlit(failing_rows(df, columns=columns)),
+    "Convert to Inferred Types": lambda df, columns=None: enhanced_sanitize_dataframe_for_streamlit(convert_inferred(df, columns=columns, errors='coerce')),
+    "Convert to Inferred Types (Quarantine Bad Rows)": lambda df, columns=None: enhanced_sanitize_dataframe_for_streamlit(convert_inferred(df, columns=columns, errors='quarantine')),
 },
     "String Cleaning": {
-    "Convert to Lowercase": lambda df: string_operations(df, 'lower', columns=st.session_state.get("selected_columns", [])),
-    "Convert to Uppercase": lambda df: string_operations(df, 'upper', columns=st.session_state.get("selected_columns", [])),
-    "Strip Whitespace": lambda df: string_operations(df, 'strip', columns=st.session_state.get("selected_columns", [])),
+    "Convert to Lowercase": lambda df, columns=None: string_operations(df, 'lower', columns=columns),
+    "Convert to Uppercase": lambda df, columns=None: string_operations(df, 'upper', columns=columns),
+    "Strip Whitespace": lambda df, columns=None: string_operations(df, 'strip', columns=columns),
    }, 
     "Handling Categorical Data": {
-    "Convert to Category": lambda df: categorical_operations(df, 'to_category', columns=st.session_state.get("selected_columns", [])),
-    "View Unique Values": lambda df: enhanced_sanitize_dataframe_for_streamlit(pd.DataFrame([f"{col}: {df[col].nunique()} unique" for col in df.columns], columns=['Unique_Counts'])),
+    "Convert to Category": lambda df, columns=None: categorical_operations(df, 'to_category', columns=columns),
+    "View Unique Values": lambda df, approximate=False: unique_counts(df, approximate=approximate),
+    "View Top Values": lambda df, columns=None, approximate=False: top_values(df, columns=columns, approximate=approximate),
 },
     "Replacing Values": {
-    "Replace Zero with NaN": lambda df: enhanced_sanitize_dataframe_for_streamlit(df[st.session_state.get("selected_columns", df.columns)].replace(0, np.nan)),
-    "Replace Negative with NaN": lambda df: enhanced_sanitize_dataframe_for_streamlit(df[st.session_state.get("selected_columns", df.columns)].applymap(lambda x: np.nan if (isinstance(x, (int, float)) and x < 0) else x)),
+    "Replace Zero with NaN": lambda df, columns=None: enhanced_sanitize_dataframe_for_streamlit(replace_values(df, [{"type": "value", "value": 0}], columns=columns)),
+    "Replace Negative with NaN": lambda df, columns=None: enhanced_sanitize_dataframe_for_streamlit(replace_values(df, [{"type": "range", "upper": 0, "inclusive": "left"}], columns=columns)),
+    "Replace Sentinels with NaN": lambda df, columns=None: enhanced_sanitize_dataframe_for_streamlit(replace_values(df, [{"type": "sentinel"}], columns=columns)),
+    "Replace by Rule": lambda df, columns=None, rules=None: enhanced_sanitize_dataframe_for_streamlit(replace_values(df, rules or [], columns=columns)),
 },
 }
\ No newline at end of file
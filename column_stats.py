@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import BoundedCache
+from dataset_store import column_tokens
+
+STATS_CACHE_MAX_MB = int(os.environ.get("EASY_ANALYTICS_STATS_CACHE_MB", "16"))
+# (token, column, rows, stat) -> value
+STATS_CACHE = BoundedCache(STATS_CACHE_MAX_MB * 1024 * 1024)
+
+NUMERIC_STATS = ("mean", "min", "max", "std")
+
+
+def column_kind(df, col):
+    """Coarse type of a column: numeric, bool, datetime, category, text or other."""
+    dtype = df[col].dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "category"
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        return "text"
+    return "other"
+
+
+def is_numeric(df, col):
+    """Numeric and not boolean, like select_dtypes(include=[np.number])."""
+    return column_kind(df, col) == "numeric"
+
+
+def numeric_columns(df):
+    return [col for col in df.columns if is_numeric(df, col)]
+
+
+def _compute(series, stat):
+    if stat == "nunique":
+        return int(series.nunique())
+    # Population std, as StandardScaler uses
+    value = series.std(ddof=0) if stat == "std" else getattr(series, stat)()
+    return float(value) if pd.notna(value) else np.nan
+
+
+def column_stat(df, col, stat):
+    """
+    nunique, mean, min, max or std (ddof=0) of one column, computed on first
+    use. Values for stored versions are cached per column token, so an op
+    only invalidates the columns it wrote.
+    """
+    if stat in NUMERIC_STATS and not is_numeric(df, col):
+        return None
+    tokens = column_tokens(df)
+    key = (tokens[col], col, len(df), stat) if tokens is not None and col in tokens else None
+    value = STATS_CACHE.get(key) if key is not None else None
+    if value is not None:
+        return value
+    value = _compute(df[col], stat)
+    if key is not None:
+        STATS_CACHE.put(key, value)
+    return value
+
+
+def column_stats(df, col, stats=("nunique",) + NUMERIC_STATS):
+    return {stat: column_stat(df, col, stat) for stat in stats}
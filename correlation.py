@@ -0,0 +1,113 @@
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from cache import BoundedCache, content_hash
+from dataset_store import column_tokens
+
+CORRELATION_CACHE_MAX_MB = int(os.environ.get("EASY_ANALYTICS_CORRELATION_CACHE_MB", "128"))
+CORRELATION_CACHE = BoundedCache(CORRELATION_CACHE_MAX_MB * 1024 * 1024)
+
+
+def _pearson(values):
+    """
+    Pearson correlation of the columns of a 2-D float array with pairwise
+    complete observations, as DataFrame.corr() computes it, built from
+    matrix products so the heavy lifting runs in BLAS.
+    """
+    missing = np.isnan(values)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        # Centering first keeps the sums of squares below well conditioned
+        values = values - np.nanmean(values, axis=0)
+        constant = np.nanmax(values, axis=0) == np.nanmin(values, axis=0)
+        filled = np.where(missing, 0.0, values)
+        # Statistic[i, j] is taken over the rows where both columns i and j are present;
+        # against a column without gaps that is just column i's own statistic
+        present = (~missing).astype(np.float64)
+        n_cols = values.shape[1]
+        counts = np.repeat(present.sum(axis=0)[:, None], n_cols, axis=1)
+        sums = np.repeat(filled.sum(axis=0)[:, None], n_cols, axis=1)
+        squares = np.repeat((filled * filled).sum(axis=0)[:, None], n_cols, axis=1)
+        gaps = np.flatnonzero(missing.any(axis=0))
+        if gaps.size:
+            counts[:, gaps] = present.T @ present[:, gaps]
+            sums[:, gaps] = filled.T @ present[:, gaps]
+            squares[:, gaps] = (filled * filled).T @ present[:, gaps]
+        cov = filled.T @ filled - sums * sums.T / counts
+        var = squares - sums * sums / counts
+        corr = cov / np.sqrt(var * var.T)
+    corr = np.clip(corr, -1.0, 1.0)
+    corr[constant, :] = np.nan
+    corr[:, constant] = np.nan
+    diagonal = np.isfinite(np.diag(corr))
+    corr[np.diag_indices_from(corr)] = np.where(diagonal, 1.0, np.nan)
+    return corr
+
+
+def correlation_matrix(df, columns=None, sample_rows=None, seed=0):
+    """
+    Correlation matrix of the numeric columns of df, optionally estimated from
+    a random sample of rows. Returns (matrix, rows used). Matrices of stored
+    dataset versions are cached per column token, so unrelated edits keep them.
+    """
+    if columns is None:
+        columns = list(df.select_dtypes(include=[np.number]).columns)
+    n_rows = len(df)
+    sampled = bool(sample_rows) and n_rows > sample_rows
+    rows_used = sample_rows if sampled else n_rows
+
+    tokens = column_tokens(df)
+    key = None
+    if tokens is not None:
+        key = content_hash("corr", tuple((col, tokens.get(col)) for col in columns), n_rows, rows_used, seed)
+        cached = CORRELATION_CACHE.get(key)
+        if cached is not None:
+            return cached, rows_used
+
+    positions = np.sort(np.random.default_rng(seed).choice(n_rows, sample_rows, replace=False)) if sampled else None
+    values = np.empty((rows_used, len(columns)), dtype=np.float64)
+    for idx, col in enumerate(columns):
+        column = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        values[:, idx] = column[positions] if sampled else column
+    matrix = pd.DataFrame(_pearson(values), index=columns, columns=columns)
+    if key is not None:
+        CORRELATION_CACHE.put(key, matrix)
+    return matrix, rows_used
+
+
+def top_k_columns(matrix, k):
+    """The k columns with the strongest correlation to any other column, in matrix order."""
+    if k is None or k >= len(matrix):
+        return matrix
+    strength = np.abs(matrix.to_numpy())
+    np.fill_diagonal(strength, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        score = np.nan_to_num(np.nanmax(strength, axis=0), nan=-1.0)
+    keep = np.sort(np.argsort(-score, kind="stable")[:k])
+    return matrix.iloc[keep, keep]
+
+
+def cluster_order(matrix):
+    """Reorder rows and columns so strongly correlated columns sit next to each other."""
+    if len(matrix) < 3:
+        return matrix
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+    distance = 1.0 - np.nan_to_num(np.abs(matrix.to_numpy()), nan=0.0)
+    distance = (distance + distance.T) / 2
+    np.fill_diagonal(distance, 0.0)
+    order = leaves_list(linkage(squareform(np.clip(distance, 0.0, None), checks=False), method="average"))
+    return matrix.iloc[order, order]
+
+
+def select_columns(matrix, mode="All", k=None):
+    """Subset of the matrix to render: all columns, the top k, or clustered (limited to k when given)."""
+    if mode == "Top k most correlated":
+        return top_k_columns(matrix, k)
+    if mode == "Clustered":
+        return cluster_order(top_k_columns(matrix, k) if k else matrix)
+    return matrix
@@ -18,12 +18,42 @@ def cleaning_menu():
     st.markdown("---")
     next_button("Next", "transform_menu")
 
+def replacement_rule_input():
+    """Widgets describing one replacement rule; returns it as the dict replace_values expects."""
+    from replacement import RULE_TYPES, DEFAULT_SENTINELS, parse_literal, parse_list
+    rule_type = st.selectbox("Rule type", RULE_TYPES, key="rule_type")
+    rule = {"type": rule_type}
+    if rule_type == "value":
+        rule["value"] = parse_literal(st.text_input("Value to replace", key="rule_value"))
+    elif rule_type == "range":
+        lower = st.text_input("From (empty for no lower bound)", key="rule_lower")
+        upper = st.text_input("To (empty for no upper bound)", key="rule_upper")
+        rule["lower"] = parse_literal(lower) if lower.strip() else None
+        rule["upper"] = parse_literal(upper) if upper.strip() else None
+        rule["inclusive"] = st.selectbox("Include bounds", ["both", "left", "right", "neither"], key="rule_inclusive")
+    elif rule_type == "regex":
+        rule["pattern"] = st.text_input("Regular expression (text columns)", key="rule_pattern")
+    elif rule_type == "isin":
+        rule["values"] = parse_list(st.text_input("Values, comma separated", key="rule_values"))
+    else:
+        rule["values"] = parse_list(st.text_input(
+            "Placeholder values, comma separated", value=", ".join(map(str, DEFAULT_SENTINELS)), key="rule_sentinels"
+        ))
+    replacement = st.text_input("Replace with (empty for missing)", key="rule_replacement")
+    rule["replacement"] = parse_literal(replacement) if replacement.strip() else None
+    return rule
+
 def operation_page():
-    from utils import enhanced_sanitize_dataframe_for_streamlit, safe_display_dataframe
-    df = st.session_state.df.copy()
+    from utils import enhanced_sanitize_dataframe_for_streamlit, apply_operation, operation_preview, current_dataframe, history_controls, recipe_controls, perf_panel, approximate_toggle
+    from perf import measure, record_output
+    from recipe import make_step, make_code_step, op_params
+    df = current_dataframe()
     op_group = st.session_state.operation_set
     back_button("cleaning_menu")
     st.title(op_group)
+    history_controls("cleaning")
+    recipe_controls("cleaning")
+    perf_panel("cleaning")
 
     if op_group not in OP_MAP1:
         st.error("Operation not found!")
@@ -34,11 +64,12 @@ def operation_page():
 
     DISPLAY_OPS = {
         "Handling Missing Values": ["Show Missing Values", "Count Missing Values", "Show Non-Missing ", "Show Missing Values by Column"],
-        "Fixing Data Types": ["View Data Types"],
+        "Fixing Data Types": ["View Data Types", "Infer Column Types", "Show Rows Failing Inferred Types"],
         "Renaming Columns": ["View Current Column Names"],
-        "Removing Duplicates": ["Show Duplicates"],
-        "Handling Categorical Data": ["View Unique Values"]
+        "Removing Duplicates": ["Show Duplicates", "Show Duplicate Groups"],
+        "Handling Categorical Data": ["View Unique Values", "View Top Values"]
     }
+    approximate = approximate_toggle(operations, "cleaning")
 
     for op_label, func in operations.items():
         is_display_op = op_label in DISPLAY_OPS.get(op_group, [])
@@ -46,34 +77,39 @@ def operation_page():
         with st.expander(op_label, expanded=True):
             requires_columns = any(keyword in op_label.lower() for keyword in [
                 "fill", "missing", "string", "category", "replace", "convert", "fix", "strip", "lower", "upper"
-            ]) and not is_display_op
+            ]) and not is_display_op or any(keyword in op_label.lower() for keyword in ["duplicate", "top values", "infer"])
 
+            params = {"approximate": approximate}
             if requires_columns:
                 all_columns = list(df.columns)
-                selected_columns = st.multiselect("Select columns", options=all_columns, default=[], key=f"cols_{op_label}")
-                st.session_state.selected_columns = selected_columns
+                params["columns"] = st.multiselect("Select columns", options=all_columns, default=[], key=f"cols_{op_label}")
+            if op_label == "Replace by Rule":
+                params["rules"] = [replacement_rule_input()]
 
             if st.button(op_label, key=f"op_{op_group}_{op_label}"):
                 try:
                     with st.spinner(f"Applying {op_label}..."):
-                        df_result = func(df)
-                        df_result = enhanced_sanitize_dataframe_for_streamlit(df_result)
-
                         if is_display_op:
+                            with measure("op", op_label.strip(), df, group=op_group) as record:
+                                df_result = record_output(record, enhanced_sanitize_dataframe_for_streamlit(func(df, **op_params(func, **params))))
                             st.session_state.last_result = df_result
                             st.success(f"Output generated for '{op_label}'")
-                            st.subheader("Result Preview")
-                            safe_display_dataframe(df_result)
+                            st.session_state.preview_op = (op_group, op_label, "result")
                         else:
-                            st.session_state.df = df_result
-                            st.success(f"Operation '{op_label}' applied successfully!")
-                            st.subheader("Updated Data Preview")
-                            safe_display_dataframe(df_result)
-                            if df_result.shape != df.shape:
-                                st.info(f"Data shape changed: {df.shape} → {df_result.shape}")
+                            df_result = apply_operation(make_step("clean", op_group, op_label, **params))
+                            if df_result is None:
+                                st.success(f"'{op_label}' added to the plan")
+                                st.session_state.preview_op = (op_group, op_label, "plan")
+                            else:
+                                st.success(f"Operation '{op_label}' applied successfully!")
+                                if df_result.shape != df.shape:
+                                    st.info(f"Data shape changed: {df.shape} → {df_result.shape}")
+                                st.session_state.preview_op = (op_group, op_label, "dataset")
                 except Exception as e:
                     st.error(f"Error applying operation: {str(e)}")
 
+            operation_preview(op_group, op_label)
+
     st.markdown("---")
     st.subheader(" Run Custom Python Code")
 
@@ -83,15 +119,14 @@ def operation_page():
 
     if st.button("Run Code", key="run_code_cleaning"):
         try:
-            local_vars = {"df": st.session_state.df.copy()}
-            exec(user_code, {}, local_vars)
-            if "df" in local_vars:
-                st.session_state.df = enhanced_sanitize_dataframe_for_streamlit(local_vars["df"])
-                st.success("Code executed successfully! DataFrame updated.")
-                st.subheader("Updated Data Preview")
-                safe_display_dataframe(st.session_state.df)
+            if apply_operation(make_code_step(user_code)) is None:
+                st.success("Code added to the plan")
+                st.session_state.preview_op = (op_group, "Run Code", "plan")
             else:
-                st.info("Code executed, but 'df' was not modified.")
+                st.success("Code executed successfully! DataFrame updated.")
+                st.session_state.preview_op = (op_group, "Run Code", "dataset")
         except Exception as e:
             st.error(" Error while executing your code:")
             st.code(str(e))
+
+    operation_preview(op_group, "Run Code")
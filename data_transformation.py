@@ -20,7 +20,8 @@ def transform_menu():
     next_button("Next", "visualize")
 
 def transform_operation_page():
-    from utils import enhanced_sanitize_dataframe_for_streamlit, safe_display_dataframe
+    from utils import apply_operation, operation_preview, current_dataframe, history_controls, recipe_controls, perf_panel, approximate_toggle
+    from recipe import make_step, make_code_step
 
     if "operation_set" not in st.session_state:
         st.error("No operation selected. Please go back and select an operation.")
@@ -28,16 +29,19 @@ def transform_operation_page():
         back_button("transform_menu")
         return
 
-    if "df" not in st.session_state:
+    if current_dataframe() is None:
         st.error("No dataframe found. Please load data first.")
         back_button("transform_menu")
         return
 
-    df = st.session_state.df.copy()
+    df = current_dataframe()
     op_group = st.session_state.operation_set
 
     back_button("transform_menu")
     st.title(op_group)
+    history_controls("transform")
+    recipe_controls("transform")
+    perf_panel("transform")
 
     if op_group not in OP_MAP2:
         st.error("Operation not found!")
@@ -57,6 +61,7 @@ def transform_operation_page():
         return
 
     operations = OP_MAP2[op_group]
+    approximate = approximate_toggle(operations, "transform")
     st.subheader("Select an operation:")
 
     column_select_ops = [
@@ -83,16 +88,22 @@ def transform_operation_page():
                     else:
                         try:
                             with st.spinner("Creating new column..."):
-                                df_result = func(df)
-                                df_result = enhanced_sanitize_dataframe_for_streamlit(df_result)
-                                st.session_state.df = df_result
-                                st.success(f"Custom column '{new_col_name}' created successfully!")
-                                st.subheader("Updated Data Preview")
-                                safe_display_dataframe(df_result)
+                                step = make_step(
+                                    "transform", op_group, op_label,
+                                    col1=col1, col2=col2, operation=operation, new_col=new_col_name
+                                )
+                                if apply_operation(step) is None:
+                                    st.success(f"Custom column '{new_col_name}' added to the plan")
+                                    st.session_state.preview_op = (op_group, op_label, "plan")
+                                else:
+                                    st.success(f"Custom column '{new_col_name}' created successfully!")
+                                    st.session_state.preview_op = (op_group, op_label, "dataset")
                         except Exception as e:
                             st.error(f"Error applying operation: {str(e)}")
                             st.write("**Error details:**", e)
 
+                operation_preview(op_group, op_label)
+
         elif needs_columns:
             with st.expander(f"{op_label}", expanded=True):
                 all_columns = list(df.columns)
@@ -110,37 +121,44 @@ def transform_operation_page():
                     if not selected_columns:
                         st.warning("Please select at least one column before applying the operation.")
                     else:
-                        st.session_state.selected_columns = selected_columns
-
                         try:
                             with st.spinner(f"Applying {op_label}..."):
-                                df_result = func(df)
-                                df_result = enhanced_sanitize_dataframe_for_streamlit(df_result)
-                                st.session_state.df = df_result
-                                st.success(f"Operation '{op_label}' applied successfully!")
-                                st.subheader("Updated Data Preview")
-                                safe_display_dataframe(df_result)
-                                if df_result.shape != df.shape:
-                                    st.info(f"Data shape changed: {df.shape} → {df_result.shape}")
+                                step = make_step(
+                                    "transform", op_group, op_label,
+                                    columns=selected_columns, inplace=inplace, approximate=approximate
+                                )
+                                df_result = apply_operation(step)
+                                if df_result is None:
+                                    st.success(f"'{op_label}' added to the plan")
+                                    st.session_state.preview_op = (op_group, op_label, "plan")
+                                else:
+                                    st.success(f"Operation '{op_label}' applied successfully!")
+                                    if df_result.shape != df.shape:
+                                        st.info(f"Data shape changed: {df.shape} → {df_result.shape}")
+                                    st.session_state.preview_op = (op_group, op_label, "dataset")
                         except Exception as e:
                             st.error(f" Error applying operation: {str(e)}")
                             st.write("**Error details:**", e)
 
+                operation_preview(op_group, op_label)
+
         else:
             if st.button(op_label, key=f"op_{op_label}"):
                 try:
                     with st.spinner(f"Applying {op_label}..."):
-                        df_result = func(df)
-                        df_result = enhanced_sanitize_dataframe_for_streamlit(df_result)
-                        st.session_state.df = df_result
-                        st.success(f"Operation '{op_label}' applied successfully!")
-                        st.subheader("Updated Data Preview")
-                        safe_display_dataframe(df_result)
-                        if df_result.shape != df.shape:
-                            st.info(f" Data shape changed: {df.shape} → {df_result.shape}")
+                        df_result = apply_operation(make_step("transform", op_group, op_label, approximate=approximate))
+                        if df_result is None:
+                            st.success(f"'{op_label}' added to the plan")
+                            st.session_state.preview_op = (op_group, op_label, "plan")
+                        else:
+                            st.success(f"Operation '{op_label}' applied successfully!")
+                            if df_result.shape != df.shape:
+                                st.info(f" Data shape changed: {df.shape} → {df_result.shape}")
+                            st.session_state.preview_op = (op_group, op_label, "dataset")
                 except Exception as e:
                     st.error(f"Error applying operation: {str(e)}")
                     st.write("**Error details:**", e)
+            operation_preview(op_group, op_label)
 
     # Custom Python interpreter
     st.markdown("---")
@@ -151,15 +169,14 @@ def transform_operation_page():
 
     if st.button("Run Code"):
         try:
-            local_vars = {"df": st.session_state.df.copy()}
-            exec(user_code, {}, local_vars)
-            if "df" in local_vars:
-                st.session_state.df = enhanced_sanitize_dataframe_for_streamlit(local_vars["df"])
-                st.success("Code executed successfully! DataFrame updated.")
-                st.subheader("Updated Data Preview")
-                safe_display_dataframe(st.session_state.df)
+            if apply_operation(make_code_step(user_code)) is None:
+                st.success("Code added to the plan")
+                st.session_state.preview_op = (op_group, "Run Code", "plan")
             else:
-                st.info("Code executed, but 'df' was not modified.")
+                st.success("Code executed successfully! DataFrame updated.")
+                st.session_state.preview_op = (op_group, "Run Code", "dataset")
         except Exception as e:
             st.error("Error while executing your code:")
-            st.code(str(e))
\ No newline at end of file
+            st.code(str(e))
+
+    operation_preview(op_group, "Run Code")
\ No newline at end of file
@@ -1,15 +1,43 @@
 import streamlit as st
-from utils import back_button, next_button, safe_display_dataframe
+import json
+import os
+from utils import back_button, next_button, safe_display_dataframe, current_dataframe, dataframe_version, perf_panel
+from cache import BoundedCache, content_hash, estimate_size
+from perf import measure
+from chart_data import WEBGL_POINT_THRESHOLD, reduce_points, pre_aggregate, render_mode
+from correlation import correlation_matrix, select_columns
+from column_stats import column_kind, numeric_columns
 import plotly.express as px
 import numpy as np
 
+HEATMAP_LABEL_MAX_COLUMNS = 25
+FIGURE_CACHE_MAX_MB = int(os.environ.get("EASY_ANALYTICS_FIGURE_CACHE_MB", "256"))
+FIGURE_CACHE = BoundedCache(
+    FIGURE_CACHE_MAX_MB * 1024 * 1024,
+    sizeof=lambda fig: estimate_size(fig.to_plotly_json()),
+)
+
+def figure_cache_key(version, chart_type, params, full_resolution, webgl_threshold):
+    """Dataset version plus a canonical hash of everything that shapes the figure."""
+    canonical = json.dumps(params, sort_keys=True, default=str)
+    return content_hash(version, chart_type, canonical, bool(full_resolution), int(webgl_threshold))
+
+def cached_chart(df, version, chart_type, params, full_resolution=False, webgl_threshold=WEBGL_POINT_THRESHOLD):
+    """create_chart through the shared figure cache; returns (figure, cache hit)."""
+    key = figure_cache_key(version, chart_type, params, full_resolution, webgl_threshold)
+    fig = FIGURE_CACHE.get(key)
+    if fig is not None:
+        return fig, True
+    fig = create_chart(df, chart_type, params, full_resolution=full_resolution, webgl_threshold=webgl_threshold)
+    return FIGURE_CACHE.put(key, fig), False
+
 def visualization_page():
     back_button("transform_menu")
     st.title("Data Visualization")
-    if st.session_state.df is None:
+    df = current_dataframe()
+    if df is None:
         st.error("No dataset loaded. Please upload data first.")
         return
-    df = st.session_state.df
 
     chart_types = [
         "Line", "Bar", "Histogram", "Box", "Scatter", "Pie", 
@@ -41,6 +69,13 @@ def visualization_page():
             params['values'] = st.selectbox("Values", df.columns, key="pie_values")
         elif chart_type == "Heatmap":
             st.info("Heatmap will use correlation matrix of numerical columns")
+            params['heatmap_subset'] = st.selectbox(
+                "Columns shown", ["All", "Top k most correlated", "Clustered"], key="heatmap_subset")
+            if params['heatmap_subset'] != "All":
+                params['heatmap_k'] = st.number_input("Number of columns (k)", 2, 1000, 20, key="heatmap_k")
+            params['heatmap_sample'] = st.number_input(
+                "Estimate from a random sample of rows (0 = all rows)", 0, 100_000_000, 0, step=10_000,
+                key="heatmap_sample")
         elif chart_type in ["Sunburst", "Treemap"]:
             params['path'] = st.multiselect("Hierarchical Path", df.columns, key="path_hier")
             params['values'] = st.selectbox("Values", df.columns, key="values_hier")
@@ -77,7 +112,7 @@ def visualization_page():
         st.subheader("Color Configuration")
         
         if 'color' in params:
-            if df[params['color']].dtype in ['object', 'category']:
+            if column_kind(df, params['color']) in ('text', 'category'):
                 color_discrete = st.selectbox("Color Palette", 
                     ['plotly', 'Set1', 'Set2', 'Set3', 'Pastel1', 'Pastel2', 'Dark2'], key="color_discrete")
                 params['color_discrete_sequence'] = getattr(px.colors.qualitative, color_discrete, None)
@@ -196,6 +231,14 @@ def visualization_page():
                 [None, 'ols', 'lowess'], key="trendline")
             if trendline:
                 params['trendline'] = trendline
+
+        webgl_threshold = WEBGL_POINT_THRESHOLD
+        if chart_type in ["Line", "Scatter"]:
+            st.subheader("Rendering")
+            webgl_threshold = st.number_input(
+                "Use WebGL from this many points", 0, 10_000_000, WEBGL_POINT_THRESHOLD, step=1000,
+                key="webgl_threshold",
+            )
         
         if chart_type == "Line":
             line_group = st.selectbox("Line Group (optional)", 
@@ -204,12 +247,29 @@ def visualization_page():
                 params['line_group'] = line_group
     
 
-    if st.button(" Generate Chart", key="generate_chart"):
+    full_resolution = st.toggle(
+        "Full resolution (send every point to the browser; slow for large datasets)",
+        key="full_resolution",
+    )
+
+    version = dataframe_version()
+    chart_key = figure_cache_key(version, chart_type, params, full_resolution, webgl_threshold)
+    generate = st.button(" Generate Chart", key="generate_chart")
+    # Keep showing the last generated chart across reruns while its inputs are unchanged
+    if generate or st.session_state.get("chart_key") == chart_key:
         try:
             with st.spinner("Generating chart..."):
-                fig = create_chart(df, chart_type, params)
-                st.plotly_chart(fig, use_container_width=True)
-                
+                if generate:
+                    with measure("chart", chart_type, df) as record:
+                        fig, hit = cached_chart(df, version, chart_type, params, full_resolution, webgl_threshold)
+                        if record is not None:
+                            record["cached"] = hit
+                        st.plotly_chart(fig, use_container_width=True)
+                    st.session_state.chart_key = chart_key
+                else:
+                    fig, _ = cached_chart(df, version, chart_type, params, full_resolution, webgl_threshold)
+                    st.plotly_chart(fig, use_container_width=True)
+
 
                 with st.expander("View Parameters Used"):
                     st.json(params)
@@ -217,13 +277,32 @@ def visualization_page():
         except Exception as e:
             st.error(f"Error generating chart: {str(e)}")
     
+    perf_panel("visualize")
     next_button("Next", "export")
 
-def create_chart(df, chart_type, params):
+def create_chart(df, chart_type, params, full_resolution=False, webgl_threshold=WEBGL_POINT_THRESHOLD):
     """Create chart based on type and parameters"""
 
     clean_params = {k: v for k, v in params.items() if v is not None and v != ""}
-    
+
+    note = None
+    if not full_resolution:
+        df, note = reduce_points(df, chart_type, clean_params)
+    df, clean_params, draw_type = pre_aggregate(df, chart_type, clean_params)
+    mode = render_mode(draw_type, len(df), clean_params, webgl_threshold)
+    if mode:
+        clean_params['render_mode'] = mode
+    fig = _build_chart(df, draw_type, clean_params)
+    if chart_type == "Histogram" and draw_type == "Bar":
+        fig.update_layout(bargap=0)
+    if note:
+        fig.add_annotation(
+            text=note, xref="paper", yref="paper", x=1, y=1, xanchor="right", yanchor="bottom",
+            showarrow=False, font=dict(size=11, color="gray"),
+        )
+    return fig
+
+def _build_chart(df, chart_type, clean_params):
     if chart_type == "Line":
         return px.line(df, **clean_params)
     elif chart_type == "Bar":
@@ -237,13 +316,22 @@ def create_chart(df, chart_type, params):
     elif chart_type == "Pie":
         return px.pie(df, **clean_params)
     elif chart_type == "Heatmap":
-        numeric_df = df.select_dtypes(include=[np.number])
-        if numeric_df.empty:
+        numeric_cols = numeric_columns(df)
+        if not numeric_cols:
             st.warning("No numeric columns found for correlation heatmap.")
             return px.scatter(x=[0], y=[0], title="No numeric data available")
-        corr_matrix = numeric_df.corr()
-        return px.imshow(corr_matrix, text_auto=True, aspect="auto", 
+        corr_matrix, rows_used = correlation_matrix(df, numeric_cols, sample_rows=clean_params.get('heatmap_sample'))
+        corr_matrix = select_columns(corr_matrix, clean_params.get('heatmap_subset', "All"), clean_params.get('heatmap_k'))
+        # Cell labels are only readable on small matrices
+        fig = px.imshow(corr_matrix, text_auto=".2f" if len(corr_matrix) <= HEATMAP_LABEL_MAX_COLUMNS else False,
+                        aspect="auto", zmin=-1, zmax=1,
                         title=clean_params.get('title', 'Correlation Heatmap'))
+        if rows_used < len(df):
+            fig.add_annotation(
+                text=f"Estimated from {rows_used:,} of {len(df):,} rows", xref="paper", yref="paper",
+                x=0, y=1, xanchor="left", yanchor="bottom", showarrow=False, font=dict(size=11, color="gray"),
+            )
+        return fig
     elif chart_type == "Area":
         return px.area(df, **clean_params)
     elif chart_type == "Violin":
@@ -0,0 +1,172 @@
+import itertools
+import weakref
+
+import pandas as pd
+
+# Versions share unchanged column data; pandas copies a column only when it is written
+pd.set_option("mode.copy_on_write", True)
+
+DEFAULT_HISTORY_DEPTH = 10
+
+# Version numbers are unique across sessions so they can key shared caches
+_VERSIONS = itertools.count(1)
+
+# Stored frames by id, so code that only sees a DataFrame can find its column tokens
+_BOUND_FRAMES = {}
+
+
+def _bind(df, tokens):
+    key = id(df)
+    ref = weakref.ref(df, lambda _, key=key: _BOUND_FRAMES.pop(key, None))
+    _BOUND_FRAMES[key] = (ref, tuple(df.columns), tokens)
+
+
+def column_tokens(df):
+    """
+    Column tokens of df when it is a stored dataset version, else None.
+    Tokens are unique across sessions, so (token, column) keys shared caches.
+    """
+    entry = _BOUND_FRAMES.get(id(df))
+    if entry is None or entry[0]() is not df or entry[1] != tuple(df.columns):
+        return None
+    return entry[2]
+
+
+def _same_column(old, new):
+    """True when two columns are backed by the same data buffer."""
+    if old.dtype != new.dtype or len(old) != len(new):
+        return False
+    if isinstance(old.dtype, pd.api.extensions.ExtensionDtype):
+        return old.array is new.array
+    old_values, new_values = old.to_numpy(), new.to_numpy()
+    return (
+        old_values.__array_interface__["data"][0] == new_values.__array_interface__["data"][0]
+        and old_values.strides == new_values.strides
+    )
+
+
+def changed_columns(old, new):
+    """Columns of new whose data is not shared with the column of the same name in old."""
+    if old is None:
+        return set(new.columns)
+    if not old.columns.is_unique or not new.columns.is_unique:
+        return set(new.columns)
+    return {col for col in new.columns if col not in old.columns or not _same_column(old[col], new[col])}
+
+
+class DatasetStore:
+    """
+    Linear history of dataset versions with bounded undo/redo.
+    Each version keeps a token per column: the version in which that column
+    was last written, so caches keyed on tokens survive unrelated edits.
+    """
+
+    def __init__(self, max_history=DEFAULT_HISTORY_DEPTH):
+        self.max_history = max_history
+        self._current = None
+        self._undo = []
+        self._redo = []
+
+    @property
+    def current(self):
+        return self._current["df"] if self._current else None
+
+    @property
+    def version(self):
+        return self._current["version"] if self._current else None
+
+    @property
+    def label(self):
+        return self._current["label"] if self._current else None
+
+    @property
+    def changed(self):
+        """Columns written by the commit that produced the current version."""
+        return self._current["changed"] if self._current else set()
+
+    @property
+    def recipe(self):
+        """Recorded steps that produced the current version from the last upload."""
+        return list(self._current["recipe"]) if self._current else []
+
+    def column_token(self, col):
+        return self._current["tokens"].get(col) if self._current else None
+
+    def commit(self, df, label=None, memory_bytes=None, steps=None, recipe=None):
+        """
+        Make df the current version; returns its version number.
+        steps are the recipe steps that derived df from the current version;
+        None starts a new recipe, as for a fresh upload. recipe replaces the
+        recipe outright, for data that was derived outside this store.
+        """
+        parent = self._current
+        version = next(_VERSIONS)
+        changed = changed_columns(parent["df"] if parent else None, df)
+        parent_tokens = parent["tokens"] if parent else {}
+        tokens = {col: version if col in changed else parent_tokens[col] for col in df.columns}
+        _bind(df, tokens)
+        self._current = {
+            "version": version,
+            "df": df,
+            "label": label,
+            "changed": changed,
+            "tokens": tokens,
+            "memory": memory_bytes,
+            "recipe": list(recipe) if recipe is not None else (
+                (parent["recipe"] if parent else []) + list(steps) if steps is not None else []
+            ),
+        }
+        if parent is not None:
+            self._undo.append(parent)
+        self._redo.clear()
+        self._trim()
+        return version
+
+    def undo(self):
+        if not self._undo:
+            return False
+        self._redo.append(self._current)
+        self._current = self._undo.pop()
+        return True
+
+    def redo(self):
+        if not self._redo:
+            return False
+        self._undo.append(self._current)
+        self._current = self._redo.pop()
+        self._trim()
+        return True
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def set_history_depth(self, max_history):
+        self.max_history = max(0, int(max_history))
+        self._trim()
+
+    def _trim(self):
+        # Dropping the references is what frees the old versions' private columns
+        excess = len(self._undo) - self.max_history
+        if excess > 0:
+            del self._undo[:excess]
+        excess = len(self._redo) - self.max_history
+        if excess > 0:
+            del self._redo[:excess]
+
+    def memory_usage(self):
+        """Deep memory usage of the current version, computed once."""
+        if self._current is None:
+            return None
+        if self._current["memory"] is None:
+            self._current["memory"] = int(self._current["df"].memory_usage(deep=True).sum())
+        return self._current["memory"]
+
+    def history(self):
+        """(version, label, shape) for every retained version, oldest first."""
+        entries = self._undo + ([self._current] if self._current else []) + self._redo[::-1]
+        return [(entry["version"], entry["label"], entry["df"].shape) for entry in entries]
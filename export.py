@@ -1,13 +1,30 @@
 import streamlit as st
-from utils import back_button, safe_display_dataframe, safe_excel_export
+from utils import back_button, paginated_display_dataframe, safe_excel_export, safe_columnar_export, dataframe_memory, current_dataframe, dataframe_version
+
+MIME_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _encode(df, export_format, compression):
+    """(bytes, file extension, button label) of df in the chosen format."""
+    if export_format == "CSV":
+        return df.to_csv(index=False).encode('utf-8'), "csv", "📄 Download as CSV"
+    if export_format == "Excel":
+        return safe_excel_export(df)
+    return safe_columnar_export(
+        df, fmt=export_format.lower(), compression=None if compression == "none" else compression
+    )
+
 
 def export_page():
     back_button("visualize")
     st.title("Export Report")
-    if st.session_state.df is None:
+    df = current_dataframe()
+    if df is None:
         st.error("No dataset to export!")
         return
-    df = st.session_state.df
     st.subheader("Dataset Summary")
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -15,34 +32,35 @@ def export_page():
     with col2:
         st.metric("Columns", df.shape[1])
     with col3:
-        st.metric("Memory Usage", f"{df.memory_usage(deep=True).sum() / 1024:.1f} KB")
+        st.metric("Memory Usage", f"{dataframe_memory() / 1024:.1f} KB")
     st.subheader("Final Dataset")
-    safe_display_dataframe(df)
+    paginated_display_dataframe(df, key="export_preview", version=dataframe_version())
     st.subheader("Export Options")
+    # Only the chosen format is encoded, on request; the bytes are kept until the dataset changes
     col1, col2 = st.columns(2)
     with col1:
-        csv_data = df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📄 Download as CSV",
-            data=csv_data,
-            file_name="processed_dataset.csv",
-            mime="text/csv"
-        )
+        export_format = st.selectbox("Format", ["CSV", "Excel", "Parquet", "Feather"], key="export_format")
+    compression = None
     with col2:
-        excel_data, file_type, button_label = safe_excel_export(df)
-        if file_type == "xlsx":
-            st.download_button(
-                label=button_label,
-                data=excel_data,
-                file_name="processed_dataset.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-        else:
-            st.download_button(
-                label=button_label,
-                data=excel_data,
-                file_name="processed_dataset.csv",
-                mime="text/csv"
-            )
-            if "not available" in button_label:
-                st.warning(" Install openpyxl for Excel export: `pip install openpyxl`")
\ No newline at end of file
+        if export_format in ("Parquet", "Feather"):
+            compression = st.selectbox("Compression", ["zstd", "snappy", "lz4", "gzip", "none"], key="columnar_compression")
+            if export_format == "Feather" and compression in ("snappy", "gzip"):
+                st.caption("Feather supports zstd, lz4 or none; using zstd.")
+                compression = "zstd"
+    export_key = (dataframe_version(), export_format, compression)
+    prepared = st.session_state.get("export_bytes")
+    if prepared is None or prepared[0] != export_key:
+        if st.button(f"Prepare {export_format} download", key="prepare_export"):
+            with st.spinner(f"Encoding {export_format}..."):
+                st.session_state.export_bytes = (export_key,) + _encode(df, export_format, compression)
+            st.rerun()
+        return
+    _, data, file_type, button_label = prepared
+    st.download_button(
+        label=button_label,
+        data=data,
+        file_name=f"processed_dataset.{file_type}",
+        mime=MIME_TYPES.get(file_type, "application/octet-stream"),
+    )
+    if export_format == "Excel" and "not available" in button_label:
+        st.warning(" Install openpyxl for Excel export: `pip install openpyxl`")
@@ -0,0 +1,133 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import BoundedCache
+from dataset_store import column_tokens
+
+FINGERPRINT_CACHE_MAX_MB = int(os.environ.get("EASY_ANALYTICS_FINGERPRINT_CACHE_MB", "512"))
+# (token, column, rows) -> factorize code per row of that column
+FINGERPRINT_CACHE = BoundedCache(FINGERPRINT_CACHE_MAX_MB * 1024 * 1024)
+
+_MULTIPLIER = np.uint64(1000003)
+
+
+def column_codes(df, col, tokens=None):
+    """
+    Factorize code per row: equal codes mean equal values under the same rules
+    as df.duplicated, so 1 and "1" differ while 0.0 and -0.0 or None and NaN match.
+    """
+    key = (tokens[col], col, len(df)) if tokens is not None and col in tokens else None
+    if key is not None:
+        codes = FINGERPRINT_CACHE.get(key)
+        if codes is not None:
+            return codes
+    codes, _ = pd.factorize(df[col])
+    if key is not None:
+        FINGERPRINT_CACHE.put(key, codes)
+    return codes
+
+
+def column_hashes(df, col, tokens=None):
+    return pd.util.hash_array(column_codes(df, col, tokens))
+
+
+def row_fingerprints(df, columns=None):
+    """
+    64-bit hash per row over columns (all by default). Column hashes of stored
+    versions are cached per token, so a new version only hashes the columns it wrote.
+    """
+    columns = list(df.columns) if not columns else list(columns)
+    tokens = column_tokens(df)
+    fingerprint = np.full(len(df), 0x345678, dtype=np.uint64)
+    multiplier = _MULTIPLIER
+    for position, col in enumerate(columns):
+        # Position-dependent mixing so swapping values between columns changes the hash
+        fingerprint ^= column_hashes(df, col, tokens)
+        fingerprint *= multiplier
+        multiplier += np.uint64(82520 + 2 * (len(columns) - position))
+    return fingerprint
+
+
+def _groups(fingerprints):
+    """Group code per row plus the first and last row position of every group, without sorting."""
+    codes, _ = pd.factorize(fingerprints)
+    n_groups = int(codes.max()) + 1 if len(codes) else 0
+    positions = np.arange(len(codes))
+    # Codes follow order of first appearance, so a row starts a group when its code tops all earlier ones
+    running = np.maximum.accumulate(codes)
+    first = positions[np.concatenate(([True], running[1:] > running[:-1]))] if len(codes) else positions
+    last = np.zeros(n_groups, dtype=np.int64)
+    np.maximum.at(last, codes, positions)
+    return codes, first, last
+
+
+def _exact_row_codes(df, columns, tokens):
+    """Group code per row built from the column codes alone, without hashing."""
+    combined = np.zeros(len(df), dtype=np.int64)
+    for col in columns:
+        # Missing values are coded -1; shift so every code is non-negative
+        values = column_codes(df, col, tokens).astype(np.int64) + 1
+        # Both factors stay below the row count, so the product cannot overflow
+        combined, _ = pd.factorize(combined * (int(values.max()) + 1) + values)
+    return combined
+
+
+def _row_groups(df, columns):
+    """
+    _groups of equal rows. Rows sharing a fingerprint are confirmed on every
+    column's values; should two different rows share one, the groups are
+    rebuilt exactly from the column codes.
+    """
+    tokens = column_tokens(df)
+    codes, first, last = _groups(row_fingerprints(df, columns))
+    candidates = np.flatnonzero(np.bincount(codes)[codes] > 1)
+    leaders = first[codes[candidates]]
+    for col in columns:
+        values = column_codes(df, col, tokens)
+        if not np.array_equal(values[candidates], values[leaders]):
+            return _groups(_exact_row_codes(df, columns, tokens))
+    return codes, first, last
+
+
+def duplicated_mask(df, columns=None, keep="first"):
+    """
+    Row mask like df.duplicated(subset=columns, keep=keep), found with one hash
+    pass over the columns and confirmed on their values.
+    """
+    columns = list(df.columns) if not columns else list(columns)
+    if len(df) == 0:
+        return np.zeros(0, dtype=bool)
+    if len(columns) == 1:
+        # A single column is factorized directly; hashing it first only adds a pass
+        return df[columns[0]].duplicated(keep=keep).to_numpy()
+    codes, first, last = _row_groups(df, columns)
+    positions = np.arange(len(codes))
+    repeated = np.bincount(codes)[codes] > 1
+    if not repeated.any():
+        return repeated
+    if keep == "first":
+        return positions != first[codes]
+    if keep == "last":
+        return positions != last[codes]
+    return repeated
+
+
+def duplicate_groups(df, columns=None):
+    """One row per set of duplicated rows: the repeated values, how often they occur and the first row label."""
+    columns = list(df.columns) if not columns else list(columns)
+    empty = pd.DataFrame(columns=columns + ["Count", "First_Row"])
+    if len(df) == 0:
+        return empty
+    codes, first, _ = _row_groups(df, columns)
+    counts = np.bincount(codes)
+    repeated = np.flatnonzero(counts > 1)
+    if not repeated.size:
+        return empty
+    repeated = repeated[np.argsort(-counts[repeated], kind="stable")]
+    positions = first[repeated]
+    groups = df[columns].iloc[positions].reset_index(drop=True)
+    groups["Count"] = counts[repeated]
+    groups["First_Row"] = [str(label) for label in df.index[positions]]
+    return groups
@@ -0,0 +1,185 @@
+import logging
+import time
+import weakref
+from contextvars import ContextVar
+
+import pandas as pd
+
+from perf import add_sanitize_time
+
+logger = logging.getLogger("easy_analytics")
+
+# Where op functions report recoverable problems; the Streamlit pages route
+# these to st.warning/st.error, headless runs to the log
+_NOTIFIER = ContextVar("notifier", default=None)
+
+def set_notifier(notifier):
+    """Route notify() calls of the current thread to notifier(message, level)."""
+    _NOTIFIER.set(notifier)
+
+def notify(message, level="warning"):
+    notifier = _NOTIFIER.get()
+    if notifier is None:
+        logger.log({"error": logging.ERROR, "info": logging.INFO}.get(level, logging.WARNING), message)
+    else:
+        notifier(message, level)
+
+NULL_TOKENS = ['nan', 'None', '<NA>', 'null', 'NULL', 'NaN']
+
+# id(df) -> (weakref to df, schema signature) for frames already known to be Arrow-safe
+_CLEAN_SCHEMAS = {}
+
+def _schema_signature(df):
+    return tuple(df.columns), tuple(df.dtypes)
+
+def _mark_clean(df):
+    key = id(df)
+    ref = weakref.ref(df, lambda _, key=key: _CLEAN_SCHEMAS.pop(key, None))
+    _CLEAN_SCHEMAS[key] = (ref, _schema_signature(df))
+
+def is_sanitized(df):
+    """True when df was produced or checked by the sanitizer and its schema is unchanged."""
+    entry = _CLEAN_SCHEMAS.get(id(df))
+    return entry is not None and entry[0]() is df and entry[1] == _schema_signature(df)
+
+def _sanitize_nullable_int(frame):
+    try:
+        return frame.astype('float64')
+    except Exception:
+        return frame.astype(str)
+
+def _sanitize_boolean(frame):
+    # Convert to string to avoid Arrow issues
+    return frame.astype(str).replace('<NA>', 'Unknown')
+
+def _sanitize_object(frame):
+    # Columns that already hold only real strings without null markers are left alone
+    dirty = [
+        col for col in frame.columns
+        if pd.api.types.infer_dtype(frame[col], skipna=False) != 'string'
+        or frame[col].isin(NULL_TOKENS).any()
+    ]
+    if not dirty:
+        return frame.iloc[:, :0]
+    return frame[dirty].astype(str).replace(NULL_TOKENS, '')
+
+def _sanitize_datetime_tz(frame):
+    return frame.apply(lambda series: series.dt.tz_localize(None))
+
+def _sanitize_category(frame):
+    # String categories are Arrow-safe as dictionaries
+    mixed = [
+        col for col in frame.columns
+        if pd.api.types.infer_dtype(frame[col].cat.categories, skipna=True) != 'string'
+    ]
+    return frame[mixed].astype(str)
+
+def _sanitizer_for(dtype_str):
+    if dtype_str == 'object':
+        return _sanitize_object
+    if dtype_str == 'category':
+        return _sanitize_category
+    if dtype_str == 'boolean':
+        return _sanitize_boolean
+    if dtype_str.startswith('Int') or 'Int' in dtype_str:
+        return _sanitize_nullable_int
+    if 'datetime' in dtype_str and 'tz' in dtype_str:
+        return _sanitize_datetime_tz
+    return None
+
+def _sanitize(df):
+    if df is None or df.empty:
+        return df
+    if is_sanitized(df):
+        return df
+
+    groups = {}
+    for col, dtype in zip(df.columns, df.dtypes):
+        groups.setdefault(str(dtype), []).append(col)
+
+    converted = {}
+    for dtype_str, cols in groups.items():
+        sanitizer = _sanitizer_for(dtype_str)
+        if sanitizer is None:
+            continue
+        try:
+            result = sanitizer(df[cols])
+        except Exception:
+            try:
+                result = df[cols].astype(str)
+            except Exception:
+                result = pd.DataFrame({col: 'Error' for col in cols}, index=df.index)
+        for col in result.columns:
+            converted[col] = result[col]
+
+    if not converted:
+        _mark_clean(df)
+        return df
+
+    df_clean = df.copy(deep=False)
+    for col, series in converted.items():
+        df_clean[col] = series
+    _mark_clean(df_clean)
+    return df_clean
+
+def enhanced_sanitize_dataframe_for_streamlit(df):
+    """
+    Enhanced DataFrame sanitization to handle all Arrow incompatibility issues.
+    Columns are handled once per dtype group, Arrow-safe columns are skipped and
+    frames whose schema is already clean are returned as-is.
+    """
+    started = time.perf_counter()
+    try:
+        return _sanitize(df)
+    finally:
+        add_sanitize_time(time.perf_counter() - started)
+
+def safe_excel_export(df, filename="processed_dataset.xlsx"):
+    """
+    Safely export DataFrame to Excel with fallback options.
+    """
+    try:
+        from io import BytesIO
+        
+        # Try to import openpyxl
+        try:
+            import openpyxl
+            output = BytesIO()
+            with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                df.to_excel(writer, sheet_name='Processed Data', index=False)
+            return output.getvalue(), "xlsx", " Download as Excel"
+        except ImportError:
+            # Fallback to CSV if openpyxl not available
+            csv_data = df.to_csv(index=False).encode('utf-8')
+            return csv_data, "csv", " Download as CSV (Excel not available)"
+    except Exception as e:
+        # Ultimate fallback
+        csv_data = df.to_csv(index=False).encode('utf-8')
+        return csv_data, "csv", "Download as CSV (Error occurred)"
+
+    pass
+
+def safe_columnar_export(df, fmt="parquet", compression="zstd"):
+    """
+    Export DataFrame to Parquet or Feather (Arrow IPC) keeping its dtypes,
+    falling back to CSV when pyarrow is missing.
+    """
+    try:
+        from io import BytesIO
+
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+            output = BytesIO()
+            if fmt == "parquet":
+                df.to_parquet(output, engine="pyarrow", compression=compression, index=False)
+                return output.getvalue(), "parquet", " Download as Parquet"
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            feather.write_feather(table, output, compression=compression or "uncompressed")
+            return output.getvalue(), "feather", " Download as Feather"
+        except ImportError:
+            csv_data = df.to_csv(index=False).encode('utf-8')
+            return csv_data, "csv", " Download as CSV (pyarrow not available)"
+    except Exception as e:
+        csv_data = df.to_csv(index=False).encode('utf-8')
+        return csv_data, "csv", "Download as CSV (Error occurred)"
@@ -0,0 +1,377 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import BoundedCache, content_hash
+from frame_utils import enhanced_sanitize_dataframe_for_streamlit
+
+PARSE_CACHE_MAX_MB = int(os.environ.get("EASY_ANALYTICS_PARSE_CACHE_MB", "1024"))
+PARSE_CACHE_DIR = os.environ.get("EASY_ANALYTICS_CACHE_DIR") or None
+PARSE_CACHE_SPILL_MAX_MB = int(os.environ.get("EASY_ANALYTICS_CACHE_DISK_MB", "8192"))
+
+STREAMING_THRESHOLD_MB = int(os.environ.get("EASY_ANALYTICS_STREAMING_THRESHOLD_MB", "100"))
+CSV_CHUNK_ROWS = 200_000
+CSV_SAMPLE_ROWS = 10_000
+
+PARSE_CACHE = BoundedCache(
+    PARSE_CACHE_MAX_MB * 1024 * 1024,
+    spill_dir=PARSE_CACHE_DIR,
+    spill_max_bytes=PARSE_CACHE_SPILL_MAX_MB * 1024 * 1024,
+)
+
+
+def file_digest(source):
+    """Hash the raw bytes of an uploaded file without copying the buffer."""
+    if hasattr(source, "getbuffer"):
+        return content_hash(source.getbuffer())
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return content_hash(source)
+    position = source.tell()
+    source.seek(0)
+    digest = content_hash(source.read())
+    source.seek(position)
+    return digest
+
+
+def parse_cache_key(source, name, **options):
+    """Cache key built from the file contents, its format and the parse options."""
+    extension = os.path.splitext(name)[1].lower()
+    return content_hash(file_digest(source), extension, sorted(options.items()))
+
+
+def file_format(name):
+    """Normalized format of a dataset file name."""
+    extension = os.path.splitext(name)[1].lower().lstrip(".")
+    if extension in ("feather", "arrow", "ipc"):
+        return "arrow"
+    if extension in ("parquet", "pq"):
+        return "parquet"
+    if extension in ("xlsx", "xls"):
+        return "excel"
+    return "csv"
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Parquet and Feather/Arrow files need pyarrow: `pip install pyarrow`")
+    return pyarrow
+
+
+def _arrow_source(source):
+    """Zero-copy Arrow input for a path (memory-mapped) or an in-memory upload."""
+    pa = _require_pyarrow()
+    if isinstance(source, (str, os.PathLike)):
+        return pa.memory_map(os.fspath(source), "r")
+    if hasattr(source, "getbuffer"):
+        return pa.BufferReader(pa.py_buffer(source.getbuffer()))
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return pa.BufferReader(pa.py_buffer(source))
+    source.seek(0)
+    return pa.BufferReader(source.read())
+
+
+def _open_arrow_ipc(source):
+    pa = _require_pyarrow()
+    import pyarrow.ipc
+    try:
+        return pa.ipc.open_file(_arrow_source(source)).read_all()
+    except pa.ArrowInvalid:
+        return pa.ipc.open_stream(_arrow_source(source)).read_all()
+
+
+def read_arrow_ipc(source, columns=None, nrows=None):
+    """Read a Feather v2 / Arrow IPC file, memory-mapping it when given a path."""
+    table = _open_arrow_ipc(source)
+    if columns:
+        table = table.select(columns)
+    if nrows:
+        table = table.slice(0, nrows)
+    return table.to_pandas()
+
+
+def read_parquet(source, columns=None, filters=None, nrows=None):
+    """
+    Read a Parquet file with column projection. filters are pushed down to
+    skip row groups whose statistics cannot match; with nrows only the
+    leading row groups needed to reach the cap are decoded.
+    """
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    if filters:
+        table = pq.read_table(_arrow_source(source), columns=columns, filters=filters)
+        if nrows:
+            table = table.slice(0, nrows)
+        return table.to_pandas()
+
+    parquet_file = pq.ParquetFile(_arrow_source(source))
+    if not nrows:
+        return parquet_file.read(columns=columns, use_pandas_metadata=True).to_pandas()
+    row_groups = []
+    rows = 0
+    for index in range(parquet_file.num_row_groups):
+        if rows >= nrows:
+            break
+        row_groups.append(index)
+        rows += parquet_file.metadata.row_group(index).num_rows
+    if not row_groups:
+        return parquet_file.schema_arrow.empty_table().to_pandas()
+    table = parquet_file.read_row_groups(row_groups, columns=columns, use_pandas_metadata=True)
+    return table.slice(0, nrows).to_pandas()
+
+
+def read_header(source, name):
+    """Return the column names of a dataset file without parsing its body."""
+    fmt = file_format(name)
+    if fmt == "parquet":
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        schema = pq.read_schema(_arrow_source(source))
+        return [field for field in schema.names if field not in _index_columns(schema)]
+    if fmt == "arrow":
+        schema = _open_arrow_ipc(source).schema
+        return [field for field in schema.names if field not in _index_columns(schema)]
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if fmt == "csv":
+        columns = list(pd.read_csv(source, nrows=0).columns)
+    else:
+        columns = list(pd.read_excel(source, nrows=0).columns)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return columns
+
+
+def _index_columns(schema):
+    """Names of stored pandas index columns, which are not user-selectable."""
+    metadata = schema.pandas_metadata or {}
+    return {col for col in metadata.get("index_columns", []) if isinstance(col, str)}
+
+
+def infer_csv_dtypes(sample):
+    """
+    Build an explicit dtype map from a leading sample of a CSV.
+    Only text columns are pinned, since reading as object cannot fail.
+    Numeric and all-missing columns are left to the parser because a later
+    chunk may hold missing values or text; they are downcast chunk by chunk
+    and unified when the chunks are combined.
+    """
+    dtypes = {}
+    for col in sample.columns:
+        if pd.api.types.is_object_dtype(sample[col]):
+            dtypes[col] = "object"
+    return dtypes
+
+
+def downcast_numeric(series):
+    """Downcast a numeric series to the narrowest dtype that keeps every value."""
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        return series
+    if pd.api.types.is_integer_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+        if len(series) and series.min() >= 0:
+            return pd.to_numeric(series, downcast="unsigned")
+        return pd.to_numeric(series, downcast="integer")
+    if series.dtype == np.float64:
+        narrowed = series.astype(np.float32)
+        if np.array_equal(narrowed.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True):
+            return narrowed
+    return series
+
+
+def iter_csv_chunks(source, usecols=None, nrows=None, chunksize=CSV_CHUNK_ROWS,
+                    sample_rows=CSV_SAMPLE_ROWS, progress=None):
+    """
+    Yield a CSV in downcast chunks read with a dtype map inferred from a
+    leading sample. source is a path or a seekable file-like object;
+    progress(fraction, rows) is called for every chunk.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as handle:
+            yield from iter_csv_chunks(handle, usecols, nrows, chunksize, sample_rows, progress)
+        return
+
+    source.seek(0, os.SEEK_END)
+    total_bytes = source.tell()
+    source.seek(0)
+
+    sample = pd.read_csv(source, usecols=usecols, nrows=sample_rows)
+    dtypes = infer_csv_dtypes(sample)
+    columns = [col for col in (usecols or sample.columns) if col in sample.columns]
+    del sample
+    source.seek(0)
+
+    rows = 0
+    reader = pd.read_csv(source, usecols=usecols, dtype=dtypes, chunksize=chunksize, nrows=nrows)
+    for chunk in reader:
+        for col in chunk.columns:
+            chunk[col] = downcast_numeric(chunk[col])
+        rows += len(chunk)
+        if progress is not None:
+            if nrows:
+                fraction = rows / nrows
+            elif total_bytes:
+                fraction = source.tell() / total_bytes
+            else:
+                fraction = 0.0
+            progress(min(fraction, 1.0), rows)
+        yield chunk[columns]
+
+
+def read_csv_chunked(source, usecols=None, nrows=None, chunksize=CSV_CHUNK_ROWS,
+                     sample_rows=CSV_SAMPLE_ROWS, progress=None):
+    """
+    Stream a CSV in chunks using a dtype map inferred from a leading sample.
+    Each chunk is downcast before it is kept, so peak memory stays close to
+    the size of the compacted result. progress(fraction, rows) is called
+    after every chunk.
+    """
+    chunks = []
+    for chunk in iter_csv_chunks(source, usecols, nrows, chunksize, sample_rows, progress):
+        chunks.append(chunk)
+
+    if not chunks:
+        # Paths are reopened by read_csv; file objects are rewound first
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return pd.read_csv(source, usecols=usecols, nrows=0)
+    df = pd.concat(chunks, ignore_index=True, copy=False)
+    del chunks
+    # Chunks that downcast differently are unified by concat; narrow once more
+    for col in df.columns:
+        df[col] = downcast_numeric(df[col])
+    return df
+
+
+def iter_dataset_chunks(source, name, usecols=None, nrows=None, chunksize=CSV_CHUNK_ROWS, progress=None):
+    """
+    Yield a dataset file (path or file-like) as DataFrames of at most
+    chunksize rows without materializing it: CSV is parsed in chunks,
+    Parquet decoded batch by batch and Arrow IPC sliced from a memory map.
+    Excel cannot be streamed and is read whole first.
+    """
+    fmt = file_format(name)
+    rows = 0
+    if fmt == "csv":
+        yield from iter_csv_chunks(source, usecols=usecols, nrows=nrows, chunksize=chunksize, progress=progress)
+        return
+    if fmt == "parquet":
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(_arrow_source(source))
+        total = min(parquet_file.metadata.num_rows, nrows or parquet_file.metadata.num_rows)
+        batches = parquet_file.iter_batches(batch_size=chunksize, columns=usecols)
+    elif fmt == "arrow":
+        table = _open_arrow_ipc(source)
+        if usecols:
+            table = table.select(usecols)
+        if nrows:
+            table = table.slice(0, nrows)
+        total = table.num_rows
+        batches = table.to_batches(max_chunksize=chunksize)
+    else:
+        df = read_dataset(source, name, usecols=usecols, nrows=nrows)
+        total = len(df)
+        batches = (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+    for batch in batches:
+        chunk = batch if isinstance(batch, pd.DataFrame) else batch.to_pandas()
+        if total - rows < len(chunk):
+            chunk = chunk.iloc[:total - rows]
+        rows += len(chunk)
+        if progress is not None:
+            progress(min(rows / total, 1.0) if total else 1.0, rows)
+        yield chunk
+        if rows >= total:
+            break
+
+
+def compact_dataframe(df, category_ratio=0.5, arrow_strings=True):
+    """
+    Shrink a DataFrame in place of the dtypes pandas inferred: numerics are
+    downcast to the narrowest lossless width, low-cardinality text columns
+    become category and the remaining text columns use Arrow-backed strings.
+    Returns the compacted frame and a memory report.
+    """
+    before = df.memory_usage(index=True, deep=True)
+    if arrow_strings:
+        try:
+            import pyarrow
+        except ImportError:
+            arrow_strings = False
+
+    result = df.copy(deep=False)
+    changes = {}
+    for col in result.columns:
+        series = result[col]
+        if pd.api.types.is_numeric_dtype(series):
+            compacted = downcast_numeric(series)
+        elif pd.api.types.is_object_dtype(series) and pd.api.types.infer_dtype(series, skipna=True) == "string":
+            if len(series) and series.nunique(dropna=False) <= category_ratio * len(series):
+                compacted = series.astype("category")
+            elif arrow_strings:
+                compacted = series.astype("string[pyarrow]")
+            else:
+                compacted = series
+        else:
+            compacted = series
+        if compacted.dtype != series.dtype:
+            result[col] = compacted
+            changes[col] = (str(series.dtype), str(compacted.dtype))
+
+    after = result.memory_usage(index=True, deep=True)
+    report = {
+        "before_bytes": int(before.sum()),
+        "after_bytes": int(after.sum()),
+        "columns": [
+            {"column": col, "from": old, "to": new,
+             "before_bytes": int(before[col]), "after_bytes": int(after[col])}
+            for col, (old, new) in changes.items()
+        ],
+    }
+    return result, report
+
+
+def read_dataset(source, name, streaming=False, usecols=None, nrows=None, filters=None, progress=None):
+    """Parse a csv/xlsx/parquet/feather file-like object into a DataFrame."""
+    fmt = file_format(name)
+    if fmt == "parquet":
+        return read_parquet(source, columns=usecols, filters=filters, nrows=nrows)
+    if fmt == "arrow":
+        return read_arrow_ipc(source, columns=usecols, nrows=nrows)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if fmt == "csv":
+        if streaming:
+            return read_csv_chunked(source, usecols=usecols, nrows=nrows, progress=progress)
+        return pd.read_csv(source, usecols=usecols, nrows=nrows)
+    df = pd.read_excel(source, usecols=usecols, nrows=nrows)
+    return df[usecols] if usecols else df
+
+
+def load_dataset(source, name, streaming=False, usecols=None, nrows=None, filters=None,
+                 compact=False, category_ratio=0.5, arrow_strings=True, progress=None):
+    """
+    Parse and sanitize an uploaded dataset, reusing a previous result when the
+    same bytes were already parsed with the same options.
+    Returns the DataFrame, its cache key and the compaction report (None when
+    compaction is off).
+    """
+    usecols = list(usecols) if usecols else None
+    nrows = int(nrows) if nrows else None
+    filters = [tuple(condition) for condition in filters] if filters else None
+    compact_options = (category_ratio, arrow_strings) if compact else None
+    key = parse_cache_key(source, name, streaming=streaming, usecols=usecols, nrows=nrows,
+                          filters=filters, compact=compact_options)
+    cached = PARSE_CACHE.get(key)
+    if cached is None:
+        df = read_dataset(source, name, streaming=streaming, usecols=usecols, nrows=nrows,
+                          filters=filters, progress=progress)
+        df = enhanced_sanitize_dataframe_for_streamlit(df)
+        report = None
+        if compact:
+            df, report = compact_dataframe(df, category_ratio=category_ratio, arrow_strings=arrow_strings)
+        cached = PARSE_CACHE.put(key, (df, report))
+    df, report = cached
+    return df, key, report
@@ -0,0 +1,145 @@
+import os
+import inspect
+import streamlit as st
+from utils import (
+    back_button, nav, safe_display_dataframe, set_dataframe, perf_panel,
+    current_out_of_core, set_out_of_core, undo_out_of_core,
+)
+from recipe import OP_MAPS, make_step, describe_step, recipe_from_json
+from out_of_core import (
+    OUT_OF_CORE_EXPORT_DIR, streamable_ops, apply_step, apply_steps, export_dataset, list_files, resolve_path,
+)
+
+# Ops with other parameters (rules, custom columns) run out-of-core through a saved recipe
+MENU_PARAMS = {"df", "columns", "inplace"}
+# Larger exports are only listed; a download goes through server memory
+DOWNLOAD_MAX_MB = int(os.environ.get("EASY_ANALYTICS_OUT_OF_CORE_DOWNLOAD_MB", "200"))
+
+
+def _menu_ops():
+    """{label: (kind, group, op, params)} of the streamable ops the page can configure."""
+    ops = {}
+    for kind, group, op in streamable_ops():
+        params = set(inspect.signature(OP_MAPS[kind][group][op]).parameters)
+        if params <= MENU_PARAMS:
+            ops[f"{group} · {op.strip()}"] = (kind, group, op, params)
+    return ops
+
+
+def _progress_bar(text):
+    bar = st.progress(0.0, text=text)
+
+    def report(fraction, partitions):
+        bar.progress(fraction, text=f"{text} {partitions:,} partitions done")
+    return bar, report
+
+
+def out_of_core_page():
+    back_button("upload")
+    st.title("Out-of-core Dataset")
+    dataset = current_out_of_core()
+    if dataset is None:
+        st.error("No out-of-core dataset open! Open one from the upload page.")
+        return
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Rows", f"{dataset.n_rows:,}")
+    with col2:
+        st.metric("Columns", len(dataset.columns))
+    with col3:
+        st.metric("Partitions", len(dataset.partitions))
+    with col4:
+        st.metric("On Disk", f"{dataset.disk_bytes / 1024 ** 2:.1f} MB")
+    st.caption(f"Stored at {dataset.path}")
+    st.subheader("Preview (first 10 rows)")
+    safe_display_dataframe(dataset.head(10))
+
+    with st.expander(f"Applied steps ({len(dataset.steps)})"):
+        for idx, step in enumerate(dataset.steps, 1):
+            st.write(f"{idx}. {describe_step(step)}")
+        if st.button("Undo", key="undo_out_of_core", disabled=len(st.session_state.get("out_of_core_history", [])) < 2):
+            undo_out_of_core()
+            st.rerun()
+
+    st.subheader("Apply an Operation")
+    st.caption("Only operations that can run one partition at a time are listed; the rest need the dataset in memory.")
+    ops = _menu_ops()
+    choice = st.selectbox("Operation", list(ops), key="out_of_core_op")
+    kind, group, op, params = ops[choice]
+    candidates = {}
+    if "columns" in params:
+        candidates["columns"] = st.multiselect("Columns (leave empty for all)", dataset.columns, key="out_of_core_columns")
+    if "inplace" in params:
+        candidates["inplace"] = st.toggle("Replace the original columns", value=True, key="out_of_core_inplace")
+    if st.button("Apply", key="apply_out_of_core"):
+        try:
+            step = make_step(kind, group, op, **candidates)
+            bar, report = _progress_bar(op.strip())
+            result = apply_step(dataset, step, progress=report)
+            bar.empty()
+            set_out_of_core(result)
+            st.rerun()
+        except Exception as e:
+            st.error(f"Error applying operation: {str(e)}")
+
+    recipe_file = st.file_uploader("Apply a saved recipe", type=["json"], key="out_of_core_recipe")
+    if recipe_file is not None and st.button("Apply recipe", key="apply_out_of_core_recipe"):
+        try:
+            steps = recipe_from_json(recipe_file.getvalue().decode("utf-8"))
+            bar, report = _progress_bar(f"Recipe ({len(steps)} steps)")
+            result = apply_steps(dataset, steps, progress=report)
+            bar.empty()
+            set_out_of_core(result)
+            st.rerun()
+        except Exception as e:
+            st.error(f"Error applying recipe: {str(e)}")
+
+    st.subheader("Export")
+    col1, col2 = st.columns(2)
+    with col1:
+        fmt = st.selectbox("Format", ["Parquet", "CSV"], key="out_of_core_format")
+    with col2:
+        name = st.text_input("File name", value=f"processed_dataset.{fmt.lower()}", key=f"out_of_core_name_{fmt}")
+    st.caption(f"Exports are written to {OUT_OF_CORE_EXPORT_DIR}")
+    if st.button("Export", key="export_out_of_core"):
+        try:
+            bar, report = _progress_bar("Writing")
+            export_dataset(dataset, name, fmt.lower(), progress=report)
+            bar.empty()
+            st.session_state.out_of_core_download = name
+            st.success(f"Exported {dataset.n_rows:,} rows to {name}")
+        except Exception as e:
+            st.error(f"Error exporting dataset: {str(e)}")
+    exports = list_files(OUT_OF_CORE_EXPORT_DIR) if os.path.isdir(OUT_OF_CORE_EXPORT_DIR) else []
+    if exports:
+        last = st.session_state.get("out_of_core_download")
+        chosen = st.selectbox(
+            "Exported files", exports, index=exports.index(last) if last in exports else 0,
+            key="out_of_core_exports",
+        )
+        path = resolve_path(OUT_OF_CORE_EXPORT_DIR, chosen)
+        size_mb = os.path.getsize(path) / 1024 ** 2
+        if size_mb <= DOWNLOAD_MAX_MB:
+            with open(path, "rb") as handle:
+                st.download_button(
+                    label=f"Download {chosen} ({size_mb:.1f} MB)",
+                    data=handle.read(),
+                    file_name=os.path.basename(chosen),
+                    key="download_out_of_core",
+                )
+        else:
+            st.caption(f"{chosen} is {size_mb:,.0f} MB, above the {DOWNLOAD_MAX_MB} MB download limit; fetch it from the server.")
+
+    st.subheader("Continue in Memory")
+    st.caption("Loads every partition into memory for the full set of operations and charts.")
+    if st.button("Load into memory", key="load_out_of_core"):
+        try:
+            with st.spinner(f"Loading {dataset.n_rows:,} rows..."):
+                df = dataset.to_pandas()
+            # The dataset did not come from the in-memory version, so its recipe starts afresh
+            set_dataframe(df, label="Out-of-core dataset", recipe=dataset.steps)
+            nav("cleaning_menu")
+        except Exception as e:
+            st.error(f"Error loading dataset: {str(e)}")
+
+    perf_panel("out_of_core")
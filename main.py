@@ -5,23 +5,27 @@ from data_cleaning import cleaning_menu, operation_page
 from data_transformation import transform_menu, transform_operation_page
 from data_visualization import visualization_page
 from export import export_page
+from large_data import out_of_core_page
 
 st.set_page_config(page_title="Easy Analytics", page_icon="", layout="wide")
 
 # Theme and style
-from utils import BTN_STYLE
+from utils import BTN_STYLE, use_streamlit_notifications, use_perf_recorder
+from dataset_store import DatasetStore
 st.markdown(BTN_STYLE, unsafe_allow_html=True)
 
 # State initialization
 if "page" not in st.session_state:
     st.session_state.page = "home"
-if "df" not in st.session_state:
-    st.session_state.df = None
+if "dataset" not in st.session_state:
+    st.session_state.dataset = DatasetStore()
 if "operation_set" not in st.session_state:
     st.session_state.operation_set = None
 
 # Page router
 def main():
+    use_streamlit_notifications()
+    use_perf_recorder()
     page_functions = {
         "home": landing_page,
         "upload": upload_page,
@@ -30,7 +34,8 @@ def main():
         "transform_menu": transform_menu,
         "transform_operation": transform_operation_page,
         "visualize": visualization_page,
-        "export": export_page
+        "export": export_page,
+        "out_of_core": out_of_core_page
     }
     current_page = st.session_state.page
     if current_page in page_functions:
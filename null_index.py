@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import BoundedCache
+from dataset_store import column_tokens
+
+NULL_INDEX_MAX_MB = int(os.environ.get("EASY_ANALYTICS_NULL_INDEX_MB", "256"))
+# (token, column, rows) -> (packed null bitmap, null count)
+NULL_INDEX = BoundedCache(NULL_INDEX_MAX_MB * 1024 * 1024)
+
+
+def _column_entry(df, col, tokens, position=None):
+    key = (tokens[col], col, len(df)) if tokens is not None and col in tokens and position is None else None
+    if key is not None:
+        entry = NULL_INDEX.get(key)
+        if entry is not None:
+            return entry
+    series = df[col] if position is None else df.iloc[:, position]
+    mask = series.isna().to_numpy()
+    entry = (np.packbits(mask), int(mask.sum()))
+    if key is not None:
+        NULL_INDEX.put(key, entry)
+    return entry
+
+
+def _entries(df, columns):
+    """
+    (column, (bitmap, count)) per column. Columns of stored versions are
+    scanned once per token; repeated labels get one entry per position and
+    are not cached, since the token of such a label is ambiguous.
+    """
+    tokens = column_tokens(df)
+    columns = df.columns if columns is None else columns
+    if df.columns.is_unique:
+        return [(col, _column_entry(df, col, tokens)) for col in columns]
+    wanted = set(columns)
+    return [
+        (col, _column_entry(df, col, tokens, position))
+        for position, col in enumerate(df.columns) if col in wanted
+    ]
+
+
+def null_counts(df, columns=None):
+    entries = _entries(df, columns)
+    return pd.Series([count for _, (_, count) in entries], index=[col for col, _ in entries], dtype="int64")
+
+
+def null_mask(df, col):
+    packed, _ = _column_entry(df, col, column_tokens(df))
+    return np.unpackbits(packed, count=len(df)).astype(bool)
+
+
+def null_frame(df, columns=None, present=False):
+    """Boolean frame of isnull() (or notnull() with present=True) rebuilt from the index."""
+    entries = _entries(df, columns)
+    masks = [np.unpackbits(packed, count=len(df)).astype(bool) for _, (packed, _) in entries]
+    if present:
+        masks = [~mask for mask in masks]
+    frame = pd.DataFrame(dict(enumerate(masks)), index=df.index, columns=range(len(masks)))
+    frame.columns = [col for col, _ in entries]
+    return frame
+
+
+def rows_with_nulls(df, columns=None, how="any"):
+    """Boolean row mask of rows with a missing value in any (or all) of the columns."""
+    entries = _entries(df, columns)
+    n_rows = len(df)
+    if not entries:
+        return np.zeros(n_rows, dtype=bool)
+    if how == "any":
+        entries = [entry for _, entry in entries if entry[1]]
+        if not entries:
+            return np.zeros(n_rows, dtype=bool)
+        packed = np.bitwise_or.reduce([entry[0] for entry in entries])
+    else:
+        if any(count == 0 for _, (_, count) in entries):
+            return np.zeros(n_rows, dtype=bool)
+        packed = np.bitwise_and.reduce([entry[0] for _, entry in entries])
+    return np.unpackbits(packed, count=n_rows).astype(bool)
+
+
+def missing_summary(df, columns=None, examples=5):
+    """One row per column: missing count, share and the labels of the first missing rows."""
+    entries = _entries(df, columns)
+    n_rows = len(df)
+    rows = []
+    for col, (packed, count) in entries:
+        first = []
+        if count:
+            positions = np.flatnonzero(np.unpackbits(packed, count=n_rows))[:examples]
+            first = [str(label) for label in df.index[positions]]
+        rows.append({
+            "Column": col,
+            "Missing_Count": count,
+            "Missing_Percent": round(100 * count / n_rows, 2) if n_rows else 0.0,
+            "First_Missing_Rows": ", ".join(first) + (", ..." if count > examples else ""),
+        })
+    return pd.DataFrame(rows, columns=["Column", "Missing_Count", "Missing_Percent", "First_Missing_Rows"])
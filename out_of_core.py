@@ -0,0 +1,465 @@
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from frame_utils import enhanced_sanitize_dataframe_for_streamlit
+from ingest import _require_pyarrow, iter_dataset_chunks
+from perf import measure, paused, record_output
+from recipe import OP_MAPS, apply_step as apply_step_in_memory, op_params
+from transforming_operations import extract_date_components, scale_values, string_transformations
+
+OUT_OF_CORE_DIR = os.environ.get("EASY_ANALYTICS_OUT_OF_CORE_DIR") or os.path.join(
+    tempfile.gettempdir(), "easy_analytics_out_of_core"
+)
+PARTITION_ROWS = int(os.environ.get("EASY_ANALYTICS_PARTITION_ROWS", "1000000"))
+# Server-side files can only be opened from here and exported to here
+OUT_OF_CORE_INPUT_DIR = os.environ.get("EASY_ANALYTICS_OUT_OF_CORE_INPUT_DIR") or os.path.join(OUT_OF_CORE_DIR, "inputs")
+OUT_OF_CORE_EXPORT_DIR = os.path.join(OUT_OF_CORE_DIR, "exports")
+# Partition directories left behind by sessions that ended without cleaning up
+STALE_DATASET_HOURS = int(os.environ.get("EASY_ANALYTICS_OUT_OF_CORE_STALE_HOURS", "24"))
+INPUT_EXTENSIONS = (".csv", ".xlsx", ".parquet", ".feather", ".arrow")
+
+_DATASET_DIR = re.compile(r"[0-9a-f]{32}")
+
+# Ops whose result on one partition does not depend on any other partition
+PARTITION_LOCAL_OPS = {
+    ("clean", "Removing Missing Values", "Drop All Missing "),
+    ("clean", "Removing Missing Values", "Drop All-Missing Rows"),
+    ("clean", "Filling Missing Values", "Fill with 0"),
+    ("clean", "Filling Missing Values", "Fill with 'Unknown'"),
+    ("clean", "Renaming Columns", "Lowercase Column Names"),
+    ("clean", "Renaming Columns", "Remove Spaces from Columns"),
+    ("clean", "String Cleaning", "Convert to Lowercase"),
+    ("clean", "String Cleaning", "Convert to Uppercase"),
+    ("clean", "String Cleaning", "Strip Whitespace"),
+    ("clean", "Replacing Values", "Replace Zero with NaN"),
+    ("clean", "Replacing Values", "Replace Negative with NaN"),
+    ("clean", "Replacing Values", "Replace Sentinels with NaN"),
+    ("clean", "Replacing Values", "Replace by Rule"),
+    ("transform", "Mathematical Transformations", "Log Transform"),
+    ("transform", "Mathematical Transformations", "Square Root Transform"),
+    ("transform", "Mathematical Transformations", "Square Transform"),
+    ("transform", "String Transformations", "Convert to Uppercase"),
+    ("transform", "String Transformations", "Convert to Lowercase"),
+    ("transform", "String Transformations", "Remove Whitespace"),
+    ("transform", "Create a New Column", "Create Custom Column"),
+    ("transform", "Datetime Transformation", "Extract Date Components"),
+}
+# Local ops that pick their columns by dtype. A partition's own dtypes can differ from the
+# dataset's (an all-missing stretch of a text column reads back as floats), so the columns
+# are resolved once from the combined schema and given to every partition.
+TARGET_KINDS = {
+    ("transform", "Mathematical Transformations", "Log Transform"): "numeric",
+    ("transform", "Mathematical Transformations", "Square Root Transform"): "numeric",
+    ("transform", "Mathematical Transformations", "Square Transform"): "numeric",
+    ("clean", "String Cleaning", "Convert to Lowercase"): "text",
+    ("clean", "String Cleaning", "Convert to Uppercase"): "text",
+    ("clean", "String Cleaning", "Strip Whitespace"): "text",
+    ("transform", "String Transformations", "Convert to Uppercase"): "text",
+    ("transform", "String Transformations", "Convert to Lowercase"): "text",
+    ("transform", "String Transformations", "Remove Whitespace"): "text",
+    ("transform", "Datetime Transformation", "Extract Date Components"): "datetime",
+}
+STRING_TRANSFORMS = {"Convert to Uppercase": "upper", "Convert to Lowercase": "lower", "Remove Whitespace": "strip"}
+# Ops that need whole-dataset statistics, gathered in a first pass over the partitions
+STATISTIC_OPS = {
+    ("clean", "Filling Missing Values", "Fill with Mean"): "mean",
+    ("transform", "Feature Scaling", "Min-Max Scaling"): "minmax",
+    ("transform", "Feature Scaling", "Standard Scaling (Z-score)"): "standard",
+}
+
+
+def _field_type(pa, types):
+    """One Arrow type for a column whose partitions disagree, e.g. int64 and double after a fill."""
+    if len(types) == 1:
+        return types[0]
+    try:
+        schemas = [pa.schema([("value", value_type)]) for value_type in types]
+        return pa.unify_schemas(schemas, promote_options="permissive").field("value").type
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return pa.large_string()
+
+
+class PartitionedDataset:
+    """
+    A dataset kept on local disk as Arrow IPC partitions. Partitions are
+    memory-mapped and read one at a time, so the whole dataset never has
+    to fit in memory. Datasets are immutable: every op writes a new one.
+    """
+
+    def __init__(self, path, partitions, columns, steps=None):
+        self.path = path
+        # (file name, rows) per partition
+        self.partitions = list(partitions)
+        self.columns = list(columns)
+        self.steps = list(steps or [])
+        # Partitions go with the dataset object, e.g. when the session holding it ends
+        self._remove = weakref.finalize(self, shutil.rmtree, path, True)
+        # Datasets never change once written, so previews are kept for the page's reruns
+        self._heads = {}
+
+    @classmethod
+    def write(cls, chunks, columns=None, steps=None, root=OUT_OF_CORE_DIR):
+        """Store an iterable of DataFrames as the partitions of a new dataset."""
+        pa = _require_pyarrow()
+        import pyarrow.ipc
+        path = os.path.join(root, uuid.uuid4().hex)
+        os.makedirs(path)
+        partitions = []
+        for chunk in chunks:
+            if columns is None:
+                columns = list(chunk.columns)
+            elif list(chunk.columns) != list(columns):
+                shutil.rmtree(path, ignore_errors=True)
+                raise ValueError(
+                    f"Partition {len(partitions)} has columns {list(chunk.columns)}, expected {list(columns)}"
+                )
+            if not len(chunk):
+                continue
+            name = f"part-{len(partitions):05d}.arrow"
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            with pa.OSFile(os.path.join(path, name), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            partitions.append((name, len(chunk)))
+        return cls(path, partitions, columns or [], steps)
+
+    @property
+    def n_rows(self):
+        return sum(rows for _, rows in self.partitions)
+
+    @property
+    def shape(self):
+        return self.n_rows, len(self.columns)
+
+    @property
+    def disk_bytes(self):
+        return sum(os.path.getsize(os.path.join(self.path, name)) for name, _ in self.partitions)
+
+    def _table(self, index):
+        pa = _require_pyarrow()
+        import pyarrow.ipc
+        name, _ = self.partitions[index]
+        return pa.ipc.open_file(pa.memory_map(os.path.join(self.path, name), "r")).read_all()
+
+    def read_partition(self, index, columns=None):
+        """One partition as a DataFrame labelled with its global row positions."""
+        table = self._table(index)
+        if columns is not None:
+            table = table.select(list(columns))
+        df = table.to_pandas()
+        start = sum(rows for _, rows in self.partitions[:index])
+        df.index = pd.RangeIndex(start, start + len(df))
+        return df
+
+    def iter_partitions(self, columns=None):
+        for index in range(len(self.partitions)):
+            yield self.read_partition(index, columns)
+
+    def head(self, n=10):
+        """First n rows, decoded from the leading record batches only."""
+        if n in self._heads:
+            return self._heads[n]
+        if not self.partitions:
+            return pd.DataFrame(columns=self.columns)
+        pa = _require_pyarrow()
+        import pyarrow.ipc
+        name, _ = self.partitions[0]
+        reader = pa.ipc.open_file(pa.memory_map(os.path.join(self.path, name), "r"))
+        batches, rows = [], 0
+        for index in range(reader.num_record_batches):
+            if rows >= n:
+                break
+            batch = reader.get_batch(index)
+            batches.append(batch)
+            rows += batch.num_rows
+        head = pa.Table.from_batches(batches, schema=reader.schema).slice(0, n).to_pandas()
+        self._heads[n] = head
+        return head
+
+    def schema(self):
+        """Arrow schema every partition can be cast to."""
+        pa = _require_pyarrow()
+        import pyarrow.ipc
+        schemas = [
+            pa.ipc.open_file(pa.memory_map(os.path.join(self.path, name), "r")).schema
+            for name, _ in self.partitions
+        ]
+        fields = []
+        for col in self.columns:
+            types = []
+            for schema in schemas:
+                value_type = schema.field(col).type
+                if value_type not in types and value_type != pa.null():
+                    types.append(value_type)
+            fields.append(pa.field(col, _field_type(pa, types or [pa.null()])))
+        return pa.schema(fields)
+
+    def numeric_columns(self):
+        return self.columns_of_kind("numeric")
+
+    def columns_of_kind(self, kind):
+        """Columns whose combined Arrow type is numeric, text or datetime."""
+        pa = _require_pyarrow()
+        checks = {
+            "numeric": lambda t: pa.types.is_integer(t) or pa.types.is_floating(t),
+            "text": lambda t: pa.types.is_string(t) or pa.types.is_large_string(t) or (
+                pa.types.is_dictionary(t) and (pa.types.is_string(t.value_type) or pa.types.is_large_string(t.value_type))
+            ),
+            "datetime": pa.types.is_timestamp,
+        }
+        return [field.name for field in self.schema() if checks[kind](field.type)]
+
+    def map_partitions(self, func, step=None, progress=None):
+        """New dataset of func(partition) for every partition, written while it streams."""
+        def chunks():
+            if not self.partitions:
+                yield func(pd.DataFrame(columns=self.columns))
+            for index, partition in enumerate(self.iter_partitions()):
+                yield func(partition)
+                if progress is not None:
+                    progress((index + 1) / len(self.partitions), index + 1)
+
+        steps = self.steps + [step] if step is not None else self.steps
+        return PartitionedDataset.write(chunks(), steps=steps, root=os.path.dirname(self.path))
+
+    def column_moments(self, columns):
+        """
+        (count, mean, sum of squared deviations, min, max) per column over all
+        partitions, merged pairwise so the variance stays accurate.
+        """
+        moments = {col: (0, 0.0, 0.0, np.nan, np.nan) for col in columns}
+        for partition in self.iter_partitions(columns):
+            for col in columns:
+                values = partition[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                values = values[~np.isnan(values)]
+                if not values.size:
+                    continue
+                n_a, mean_a, m2_a, low, high = moments[col]
+                n_b, mean_b = values.size, values.mean()
+                m2_b = np.sum((values - mean_b) ** 2)
+                n = n_a + n_b
+                delta = mean_b - mean_a
+                moments[col] = (
+                    n,
+                    mean_a + delta * n_b / n,
+                    m2_a + m2_b + delta * delta * n_a * n_b / n,
+                    np.fmin(low, values.min()),
+                    np.fmax(high, values.max()),
+                )
+        return moments
+
+    def to_pandas(self):
+        partitions = list(self.iter_partitions())
+        if not partitions:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(partitions, copy=False)
+
+    def to_csv(self, path, progress=None):
+        with open(path, "w", newline="", encoding="utf-8") as handle:
+            if not self.partitions:
+                pd.DataFrame(columns=self.columns).to_csv(handle, index=False)
+            for index, partition in enumerate(self.iter_partitions()):
+                partition.to_csv(handle, index=False, header=index == 0)
+                if progress is not None:
+                    progress((index + 1) / len(self.partitions), index + 1)
+
+    def to_parquet(self, path, compression="zstd", progress=None):
+        """Write one Parquet file, one row group per partition, without going through pandas."""
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        schema = self.schema()
+        with pq.ParquetWriter(path, schema, compression=compression or "none") as writer:
+            for index in range(len(self.partitions)):
+                writer.write_table(self._table(index).select(self.columns).cast(schema))
+                if progress is not None:
+                    progress((index + 1) / len(self.partitions), index + 1)
+
+    def remove(self):
+        self._remove()
+
+
+def resolve_path(root, name):
+    """Absolute path of name inside root; names that resolve outside it raise ValueError."""
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, name))
+    if path == root or os.path.commonpath([root, path]) != root:
+        raise ValueError(f"'{name}' is outside {root}")
+    return path
+
+
+def list_files(root, extensions=None):
+    """File names under root, relative to it."""
+    names = []
+    for directory, _, files in os.walk(root):
+        for file_name in files:
+            if extensions is None or file_name.lower().endswith(extensions):
+                names.append(os.path.relpath(os.path.join(directory, file_name), root))
+    return sorted(names)
+
+
+def input_files():
+    return list_files(OUT_OF_CORE_INPUT_DIR, INPUT_EXTENSIONS)
+
+
+def remove_stale_datasets(root=OUT_OF_CORE_DIR, max_age_hours=STALE_DATASET_HOURS):
+    """Remove partition directories not touched for max_age_hours; inputs and exports are kept."""
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - max_age_hours * 3600
+    for entry in os.scandir(root):
+        if entry.is_dir() and _DATASET_DIR.fullmatch(entry.name) and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def export_dataset(dataset, name, fmt, progress=None):
+    """Write dataset as csv or parquet to name inside the export directory; returns the path."""
+    path = resolve_path(OUT_OF_CORE_EXPORT_DIR, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if fmt == "parquet":
+        dataset.to_parquet(path, progress=progress)
+    else:
+        dataset.to_csv(path, progress=progress)
+    return path
+
+
+def open_dataset(source, name, usecols=None, nrows=None, partition_rows=PARTITION_ROWS, progress=None, root=OUT_OF_CORE_DIR):
+    """
+    Stream a dataset file (path or upload) into partitions on disk, sanitizing
+    each as it arrives. Paths must be names inside OUT_OF_CORE_INPUT_DIR.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        source = resolve_path(OUT_OF_CORE_INPUT_DIR, source)
+    remove_stale_datasets(root)
+    chunks = iter_dataset_chunks(source, name, usecols=usecols, nrows=nrows, chunksize=partition_rows, progress=progress)
+    return PartitionedDataset.write((enhanced_sanitize_dataframe_for_streamlit(chunk) for chunk in chunks), root=root)
+
+
+def is_streamable(step):
+    key = (step.get("kind"), step.get("group"), step.get("op"))
+    return key in PARTITION_LOCAL_OPS or key in STATISTIC_OPS
+
+
+def streamable_ops():
+    """(kind, group, op) of every op that can run out-of-core, in menu order."""
+    return [
+        (kind, group, op)
+        for kind, groups in OP_MAPS.items()
+        for group, ops in groups.items()
+        for op in ops
+        if (kind, group, op) in PARTITION_LOCAL_OPS or (kind, group, op) in STATISTIC_OPS
+    ]
+
+
+def _statistic_func(dataset, step, statistic):
+    """Per-partition function applying the step with statistics gathered over the whole dataset."""
+    func = OP_MAPS[step["kind"]][step["group"]][step["op"]]
+    params = op_params(func, **(step.get("params") or {}))
+    numeric = dataset.numeric_columns()
+    columns = step.get("columns") or None
+    if statistic == "mean":
+        targets = [col for col in (columns or numeric) if col in numeric]
+    else:
+        targets = list(columns or numeric)
+        if not targets:
+            raise ValueError("No numeric columns found for scaling.")
+    moments = dataset.column_moments(targets)
+
+    if statistic == "mean":
+        means = {col: moment[1] for col, moment in moments.items() if moment[0]}
+
+        def fill(partition):
+            result = partition.copy(deep=False)
+            for col, mean in means.items():
+                if partition[col].isna().any():
+                    result[col] = partition[col].fillna(mean)
+            return enhanced_sanitize_dataframe_for_streamlit(result)
+        return fill
+
+    stats = {}
+    for col, (count, mean, m2, low, high) in moments.items():
+        if statistic == "minmax":
+            stats[col] = (low, high)
+        else:
+            stats[col] = (mean if count else np.nan, np.sqrt(m2 / count) if count else np.nan)
+    inplace = params.get("inplace", True)
+
+    def scale(partition):
+        result = partition.copy(deep=False)
+        for col, (first, second) in stats.items():
+            values = partition[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            if np.isinf(values).any():
+                raise ValueError(f"column '{col}' contains infinity")
+            result[col if inplace else f"{statistic}_scaled_{col}"] = scale_values(values, statistic, first, second)
+        return enhanced_sanitize_dataframe_for_streamlit(result)
+    return scale
+
+
+def _targeted_func(dataset, step, kind):
+    """Per-partition function running a dtype-driven step on the columns of that kind in the whole dataset."""
+    targets = list(step.get("columns") or dataset.columns_of_kind(kind))
+
+    def align(partition):
+        # All-missing stretches read back with another dtype; give them the dataset's
+        result = partition.copy(deep=False)
+        for col in targets:
+            if kind == "numeric" and not pd.api.types.is_numeric_dtype(partition[col]):
+                result[col] = pd.to_numeric(partition[col], errors="coerce")
+            elif kind == "datetime" and not pd.api.types.is_datetime64_any_dtype(partition[col]):
+                result[col] = pd.to_datetime(partition[col], errors="coerce")
+        return result
+
+    if step["group"] == "String Transformations":
+        operation = STRING_TRANSFORMS[step["op"]]
+        return lambda partition: string_transformations(partition, operation, columns=targets)
+    if step["op"] == "Extract Date Components":
+        return lambda partition: extract_date_components(align(partition), columns=targets)
+    if not targets:
+        # An empty column list would make the op fall back to each partition's own dtypes
+        return lambda partition: partition
+    targeted = dict(step, columns=targets)
+    return lambda partition: apply_step_in_memory(align(partition), targeted)
+
+
+def apply_step(dataset, step, progress=None):
+    """
+    Run a recipe step partition by partition and return the new dataset.
+    Steps that need the whole dataset at once (duplicates, forward fill,
+    binning, custom code, ...) raise ValueError.
+    """
+    key = (step.get("kind"), step.get("group"), step.get("op"))
+    if key in TARGET_KINDS:
+        func = _targeted_func(dataset, step, TARGET_KINDS[key])
+    elif key in PARTITION_LOCAL_OPS:
+        def func(partition):
+            return apply_step_in_memory(partition, step)
+    elif key in STATISTIC_OPS:
+        func = _statistic_func(dataset, step, STATISTIC_OPS[key])
+    else:
+        raise ValueError(f"'{str(step.get('op')).strip()}' needs the whole dataset in memory and cannot run out-of-core")
+    with measure("op", f"{step['op'].strip()} (out-of-core)", dataset, group=step["group"]) as record:
+        # Partitions are not recorded one by one
+        with paused():
+            result = dataset.map_partitions(func, step=step, progress=progress)
+        record_output(record, result)
+    return result
+
+
+def apply_steps(dataset, steps, progress=None):
+    """Replay a recipe out-of-core; intermediate datasets are removed once the next one is written."""
+    for step in steps:
+        if not is_streamable(step):
+            raise ValueError(f"'{str(step.get('op')).strip()}' needs the whole dataset in memory and cannot run out-of-core")
+    original = dataset
+    for step in steps:
+        result = apply_step(dataset, step, progress=progress)
+        if dataset is not original:
+            dataset.remove()
+        dataset = result
+    return dataset
@@ -0,0 +1,40 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads used for column-parallel ops; 0 means one per CPU core
+COLUMN_WORKERS = int(os.environ.get("EASY_ANALYTICS_COLUMN_WORKERS", "0"))
+# Below this many rows the pool costs more than it saves
+PARALLEL_MIN_ROWS = int(os.environ.get("EASY_ANALYTICS_PARALLEL_MIN_ROWS", "100000"))
+
+
+def column_workers(n_columns, n_rows, max_workers=None):
+    if n_rows < PARALLEL_MIN_ROWS:
+        return 1
+    workers = max_workers or COLUMN_WORKERS or os.cpu_count() or 1
+    return max(1, min(workers, n_columns))
+
+
+def map_columns(func, df, columns, *args, max_workers=None, return_exceptions=False):
+    """
+    {column: func(df, column, *args)} for every column, computed on a thread
+    pool. NumPy and Arrow kernels release the GIL, so independent columns
+    run side by side; results come back in column order and match a serial
+    loop. With return_exceptions=True a failing column maps to its exception
+    instead of aborting the others, so the caller can report it.
+    Workers must not call notify(): it is bound to the calling thread.
+    """
+    columns = list(columns)
+
+    def run(col):
+        try:
+            return func(df, col, *args)
+        except Exception as e:
+            if return_exceptions:
+                return e
+            raise
+
+    workers = column_workers(len(columns), len(df), max_workers)
+    if workers <= 1:
+        return {col: run(col) for col in columns}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(columns, pool.map(run, columns)))
@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+MAX_RECORDS = 1000
+
+# List that measurements of the current thread are appended to; None disables recording
+_RECORDS = ContextVar("perf_records", default=None)
+# Accumulates sanitizer seconds spent inside the innermost measurement
+_SANITIZE_SECONDS = ContextVar("perf_sanitize_seconds", default=None)
+# tracemalloc slows every allocation, so peak memory is only traced on request
+_TRACE_MEMORY = ContextVar("perf_trace_memory", default=False)
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+# Whether tracemalloc was started here, and so may be stopped here
+_owns_tracing = False
+
+
+def set_recorder(records, trace_memory=False):
+    """Record measurements of the current thread into records (a list), or stop with None."""
+    _RECORDS.set(records)
+    _TRACE_MEMORY.set(trace_memory)
+
+
+@contextmanager
+def paused():
+    """Suspend recording, e.g. for previews that rerun on every page render."""
+    token = _RECORDS.set(None)
+    try:
+        yield
+    finally:
+        _RECORDS.reset(token)
+
+
+def _start_tracing():
+    """Baseline of traced memory, or None when someone else's tracing is running."""
+    global _tracing_users, _owns_tracing
+    with _tracing_lock:
+        if not _owns_tracing:
+            if tracemalloc.is_tracing():
+                # Resetting the peak would disturb the other tracer, so no peak is measured
+                return None
+            tracemalloc.start()
+            _owns_tracing = True
+        _tracing_users += 1
+        if _tracing_users == 1:
+            tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+
+def _stop_tracing(baseline):
+    global _tracing_users, _owns_tracing
+    if baseline is None:
+        return None
+    with _tracing_lock:
+        # The peak is process-wide; concurrent measurements see each other's allocations
+        peak = max(tracemalloc.get_traced_memory()[1] - baseline, 0)
+        _tracing_users -= 1
+        if _tracing_users == 0 and _owns_tracing:
+            tracemalloc.stop()
+            _owns_tracing = False
+        return peak
+
+
+def _shape(df):
+    shape = getattr(df, "shape", None)
+    return list(shape) if shape is not None else None
+
+
+@contextmanager
+def measure(kind, name, df=None, **extra):
+    """
+    Time a block and record wall time, peak traced memory, input/output shape
+    and the sanitizer time spent inside it. Yields the record (None when
+    recording is off); set its output with record_output().
+    """
+    records = _RECORDS.get()
+    if records is None:
+        yield None
+        return
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "kind": kind,
+        "name": name,
+        "input_shape": _shape(df),
+        "output_shape": None,
+        **extra,
+    }
+    sanitize_seconds = [0.0]
+    sanitize_token = _SANITIZE_SECONDS.set(sanitize_seconds)
+    trace_memory = _TRACE_MEMORY.get()
+    baseline = _start_tracing() if trace_memory else None
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = str(e)
+        raise
+    finally:
+        record["wall_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        peak = _stop_tracing(baseline) if trace_memory else None
+        record["peak_mb"] = round(peak / 1024 ** 2, 3) if peak is not None else None
+        record["sanitize_ms"] = round(sanitize_seconds[0] * 1000, 3)
+        _SANITIZE_SECONDS.reset(sanitize_token)
+        records.append(record)
+        del records[:-MAX_RECORDS]
+
+
+def record_output(record, df):
+    if record is not None:
+        record["output_shape"] = _shape(df)
+    return df
+
+
+def add_sanitize_time(seconds):
+    """Called by the sanitizer so its share of an op's time can be reported."""
+    accumulator = _SANITIZE_SECONDS.get()
+    if accumulator is not None:
+        accumulator[0] += seconds
+
+
+def records_to_jsonl(records):
+    return "\n".join(json.dumps(record, default=str) for record in records) + ("\n" if records else "")
@@ -0,0 +1,92 @@
+import inspect
+import json
+
+from cleaning_operations import OP_MAP1
+from transforming_operations import OP_MAP2
+from frame_utils import enhanced_sanitize_dataframe_for_streamlit
+from perf import measure, record_output
+
+RECIPE_FORMAT = 1
+
+OP_MAPS = {"clean": OP_MAP1, "transform": OP_MAP2}
+
+
+def op_params(func, **candidates):
+    """Keep only the parameters func accepts, so every recorded step is replayable as-is."""
+    accepted = inspect.signature(func).parameters
+    return {name: value for name, value in candidates.items() if name in accepted}
+
+
+def make_step(kind, group, op, **params):
+    """Serializable description of one applied cleaning or transformation op."""
+    func = OP_MAPS[kind][group][op]
+    params = op_params(func, **params)
+    columns = params.pop("columns", None)
+    return {
+        "kind": kind,
+        "group": group,
+        "op": op,
+        "columns": list(columns) if columns is not None else None,
+        "params": params,
+    }
+
+
+def make_code_step(code):
+    """Step replaying user code from the custom code box against df."""
+    return {"kind": "code", "group": None, "op": "Custom code", "columns": None, "params": {"code": code}}
+
+
+def describe_step(step):
+    text = step["op"].strip()
+    if step.get("columns"):
+        text += f" on {', '.join(map(str, step['columns']))}"
+    params = {k: v for k, v in step.get("params", {}).items() if k != "code"}
+    if params:
+        text += " (" + ", ".join(f"{k}={v}" for k, v in params.items()) + ")"
+    return text
+
+
+def apply_step(df, step):
+    """Run one recorded step on df without touching any UI state."""
+    with measure("op", step["op"].strip(), df, group=step.get("group")) as record:
+        return record_output(record, _apply_step(df, step))
+
+
+def _apply_step(df, step):
+    if step["kind"] == "code":
+        local_vars = {"df": df.copy(deep=False)}
+        exec(step["params"]["code"], {}, local_vars)
+        return local_vars.get("df", df)
+    try:
+        func = OP_MAPS[step["kind"]][step["group"]][step["op"]]
+    except KeyError:
+        raise ValueError(f"Unknown operation: {step.get('group')} / {step.get('op')}")
+    params = dict(step.get("params") or {})
+    if step.get("columns") is not None:
+        params["columns"] = step["columns"]
+    return func(df, **params)
+
+
+def run_recipe(df, steps):
+    """
+    Execute a plan of steps as one pass. Intermediate results are neither
+    versioned nor previewed and share untouched columns with their input,
+    so each step only materializes the columns it writes and is released
+    as soon as the next step has run.
+    """
+    for step in steps:
+        df = apply_step(df, step)
+    return enhanced_sanitize_dataframe_for_streamlit(df)
+
+
+def recipe_to_json(steps):
+    return json.dumps({"format": RECIPE_FORMAT, "steps": list(steps)}, indent=2, default=str)
+
+
+def recipe_from_json(text):
+    data = json.loads(text)
+    if isinstance(data, list):
+        return data
+    if data.get("format", RECIPE_FORMAT) > RECIPE_FORMAT:
+        raise ValueError(f"Unsupported recipe format: {data.get('format')}")
+    return data["steps"]
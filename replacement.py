@@ -0,0 +1,117 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from column_stats import column_kind
+
+RULE_TYPES = ("value", "range", "regex", "isin", "sentinel")
+
+# Placeholders commonly used for "no value" in exported data
+DEFAULT_SENTINELS = ["NA", "N/A", "n/a", "#N/A", "-", "?", -999, -9999]
+
+
+def parse_literal(text):
+    """A number when the text reads as one, otherwise the text itself."""
+    text = text.strip()
+    try:
+        return float(text) if any(ch in text for ch in ".eE") else int(text)
+    except ValueError:
+        return text
+
+
+def parse_list(text):
+    return [parse_literal(item) for item in text.split(",")] if text.strip() else []
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
+
+
+def _matching(values, kind):
+    """The literals a column of this kind can hold: numbers for numeric columns, strings for text."""
+    if kind == "numeric":
+        return [value for value in values if _is_number(value)]
+    if kind in ("text", "category"):
+        return [value for value in values if isinstance(value, str)]
+    return []
+
+
+def compile_rule(rule):
+    """
+    Turn a rule dict into mask(series, kind) -> boolean Series, or None where
+    the rule cannot apply to that kind of column.
+    """
+    rule_type = rule.get("type")
+    if rule_type == "value":
+        return compile_rule({"type": "isin", "values": [rule.get("value")]})
+    if rule_type in ("isin", "sentinel"):
+        values = rule.get("values")
+        values = DEFAULT_SENTINELS if values is None and rule_type == "sentinel" else values or []
+
+        def mask(series, kind):
+            candidates = _matching(values, kind)
+            if not candidates:
+                return None
+            if kind == "numeric" and len(candidates) <= 8:
+                # A few comparisons beat isin's hash table on numeric columns
+                result = series.eq(candidates[0])
+                for value in candidates[1:]:
+                    result |= series.eq(value)
+                return result
+            return series.isin(candidates)
+        return mask
+    if rule_type == "range":
+        lower = rule.get("lower")
+        upper = rule.get("upper")
+        inclusive = rule.get("inclusive", "both")
+        lower = -np.inf if lower is None else lower
+        upper = np.inf if upper is None else upper
+
+        def mask(series, kind):
+            return series.between(lower, upper, inclusive=inclusive) if kind == "numeric" else None
+        return mask
+    if rule_type == "regex":
+        pattern = re.compile(rule["pattern"])
+
+        def mask(series, kind):
+            if kind not in ("text", "category"):
+                return None
+            return series.str.contains(pattern, na=False)
+        return mask
+    raise ValueError(f"Unknown replacement rule type: {rule_type}")
+
+
+def _replace(series, mask, replacement):
+    if replacement is None:
+        return series.mask(mask)
+    if isinstance(series.dtype, pd.CategoricalDtype) and replacement not in series.cat.categories:
+        series = series.cat.add_categories([replacement])
+    return series.mask(mask, replacement)
+
+
+def replace_values(df, rules, columns=None):
+    """
+    Apply replacement rules in order to the selected columns (all by default).
+    Each rule is a dict with a type from RULE_TYPES and an optional
+    replacement (missing when absent); other columns are left untouched.
+    """
+    compiled = [(compile_rule(rule), rule.get("replacement")) for rule in rules]
+    result = df.copy(deep=False)
+    target_cols = columns if columns else result.columns
+    for col in target_cols:
+        series = result[col]
+        kind = column_kind(result, col)
+        changed = False
+        for mask_for, replacement in compiled:
+            mask = mask_for(series, kind)
+            if mask is None:
+                continue
+            mask = mask.fillna(False).astype(bool)
+            if mask.any():
+                series = _replace(series, mask, replacement)
+                changed = True
+        # Columns without a match are not rewritten, so they keep their cached statistics
+        if changed:
+            result[col] = series
+    return result
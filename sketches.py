@@ -0,0 +1,272 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import BoundedCache
+from dataset_store import column_tokens
+
+SKETCH_CACHE_MAX_MB = int(os.environ.get("EASY_ANALYTICS_SKETCH_CACHE_MB", "64"))
+# (token, column, rows, kind) -> sketch
+SKETCH_CACHE = BoundedCache(SKETCH_CACHE_MAX_MB * 1024 * 1024)
+
+# Columns are fed to a sketch in chunks of this many rows, as a streaming reader would
+SKETCH_CHUNK_ROWS = 1_000_000
+
+
+def _mix(hashes):
+    """splitmix64 finalizer, spreading weak hashes (small ints hash to themselves) over all 64 bits."""
+    hashes = hashes ^ (hashes >> np.uint64(30))
+    hashes *= np.uint64(0xBF58476D1CE4E5B9)
+    hashes ^= hashes >> np.uint64(27)
+    hashes *= np.uint64(0x94D049BB133111EB)
+    return hashes ^ (hashes >> np.uint64(31))
+
+
+def _value_hashes(values):
+    """
+    64-bit hash per non-null value. Equal values hash equally across chunks
+    and processes, so sketches built anywhere can be merged.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_object_dtype(values.dtype) or isinstance(values.dtype, pd.StringDtype):
+        array = values.to_numpy(dtype=object)
+        array = array[~pd.isna(array)]
+        if pd.api.types.infer_dtype(array, skipna=False) not in ("string", "empty"):
+            # Hashing goes through str(), so other values are tagged with their type to keep 1 and "1" apart
+            array = np.array(
+                [value if isinstance(value, str) else f"\0{type(value).__name__}:{value}" for value in array],
+                dtype=object,
+            )
+        return pd.util.hash_array(array, categorize=False)
+    return pd.util.hash_pandas_object(values.dropna(), index=False, categorize=False).to_numpy()
+
+
+class HyperLogLog:
+    """
+    Distinct count estimate from 2**precision one-byte registers. Sketches of
+    different chunks merge into the sketch of their concatenation.
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def nbytes(self):
+        return self.registers.nbytes
+
+    @property
+    def relative_error(self):
+        """Standard error of the estimate relative to the true count."""
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def update_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not hashes.size:
+            return self
+        rest_bits = 64 - self.precision
+        buckets = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        # Position of the leftmost set bit within the remaining bits; rest fits a float exactly
+        _, exponent = np.frexp(rest.astype(np.float64))
+        ranks = (rest_bits + 1 - exponent).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+        return self
+
+    def update(self, values):
+        return self.update_hashes(_value_hashes(values))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are still empty
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile summary in the style of KLL: levels of items whose
+    weight doubles per level, each compacted by keeping every other sorted
+    item once it outgrows the capacity. Every compaction at level h moves
+    any rank by at most 2**h, and that bound is tracked exactly.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.levels = []
+        self.n = 0
+        self.rank_error_bound = 0
+        self.min = np.nan
+        self.max = np.nan
+        self._offset = 0
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.levels)
+
+    @property
+    def rank_error(self):
+        """Largest possible error of a quantile's rank, as a fraction of all values."""
+        return self.rank_error_bound / self.n if self.n else 0.0
+
+    def _add(self, height, items):
+        while len(self.levels) <= height:
+            self.levels.append(np.empty(0, dtype=np.float64))
+        self.levels[height] = np.concatenate((self.levels[height], items))
+
+    def _compress(self):
+        height = 0
+        while height < len(self.levels):
+            level = self.levels[height]
+            if len(level) > self.capacity:
+                items = np.sort(level)
+                carry = len(items) % 2
+                self.levels[height] = items[len(items) - carry:]
+                # Alternating the kept half keeps the errors of successive compactions from piling up one way
+                self._add(height + 1, items[self._offset:len(items) - carry:2])
+                self._offset ^= 1
+                self.rank_error_bound += 1 << height
+            height += 1
+
+    def update(self, values):
+        values = pd.Series(values).to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return self
+        self.n += len(values)
+        self.min = np.fmin(self.min, values.min())
+        self.max = np.fmax(self.max, values.max())
+        self._add(0, values)
+        self._compress()
+        return self
+
+    def merge(self, other):
+        for height, items in enumerate(other.levels):
+            self._add(height, items)
+        self.n += other.n
+        self.rank_error_bound += other.rank_error_bound
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        qs = np.asarray(qs, dtype=np.float64)
+        if not self.n:
+            return np.full(qs.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 1 << h, dtype=np.int64) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items = items[order]
+        ranks = np.cumsum(weights[order])
+        positions = np.searchsorted(ranks, qs * self.n, side="left").clip(0, len(items) - 1)
+        result = items[positions]
+        # The extremes are tracked exactly
+        result[qs <= 0] = self.min
+        result[qs >= 1] = self.max
+        return result
+
+
+class HeavyHitters:
+    """
+    Misra-Gries summary of at most k counters. Estimated counts are low by at
+    most `error`, and every value occurring more than `error` times is kept.
+    """
+
+    def __init__(self, k=64):
+        self.k = k
+        self.counts = pd.Series(dtype=np.int64)
+        self.n = 0
+        self.error = 0
+
+    @property
+    def nbytes(self):
+        return int(self.counts.memory_usage(index=True, deep=True))
+
+    def _reduce(self, counts):
+        counts = counts[counts > 0]
+        if len(counts) > self.k:
+            # Subtracting the (k+1)-th largest count leaves at most k positive counters
+            threshold = int(counts.nlargest(self.k + 1).iloc[-1])
+            counts = counts - threshold
+            counts = counts[counts > 0]
+            self.error += threshold
+        self.counts = counts.astype(np.int64)
+
+    def update(self, values):
+        counts = pd.Series(values).value_counts(dropna=True)
+        if isinstance(counts.index, pd.CategoricalIndex):
+            counts.index = counts.index.astype(object)
+        self.n += int(counts.sum())
+        self._reduce(self.counts.add(counts, fill_value=0))
+        return self
+
+    def merge(self, other):
+        self.n += other.n
+        self.error += other.error
+        self._reduce(self.counts.add(other.counts, fill_value=0))
+        return self
+
+    def top(self, n=10):
+        """The n most frequent values with the range their true count lies in."""
+        top = self.counts.nlargest(n)
+        return pd.DataFrame({
+            "Value": top.index,
+            "Count_Low": top.to_numpy(),
+            "Count_High": top.to_numpy() + self.error,
+        })
+
+
+SKETCH_TYPES = {"distinct": HyperLogLog, "quantiles": QuantileSketch, "top": HeavyHitters}
+
+
+def column_sketch(df, col, kind):
+    """
+    Sketch of one column ("distinct", "quantiles" or "top"), built chunk by
+    chunk and merged. Sketches of stored versions are cached per column token.
+    """
+    tokens = column_tokens(df)
+    key = (tokens[col], col, len(df), kind) if tokens is not None and col in tokens else None
+    sketch = SKETCH_CACHE.get(key) if key is not None else None
+    if sketch is not None:
+        return sketch
+    sketch = SKETCH_TYPES[kind]()
+    column = df[col]
+    for start in range(0, len(column), SKETCH_CHUNK_ROWS):
+        sketch.update(column.iloc[start:start + SKETCH_CHUNK_ROWS])
+    if key is not None:
+        SKETCH_CACHE.put(key, sketch)
+    return sketch
+
+
+def approximate_nunique(df, col):
+    """Estimated distinct non-null values and the half-width of a ~95% interval around it."""
+    sketch = column_sketch(df, col, "distinct")
+    estimate = sketch.estimate()
+    return estimate, int(np.ceil(2 * sketch.relative_error * estimate))
+
+
+def approximate_qcut(df, col, q, labels=None):
+    """
+    pd.qcut with bin edges read from the column's quantile sketch.
+    Returns the bins and the sketch's rank error: each edge's rank is off by
+    at most that fraction of the values.
+    """
+    sketch = column_sketch(df, col, "quantiles")
+    edges = np.maximum.accumulate(sketch.quantiles(np.linspace(0, 1, q + 1)))
+    if np.isnan(edges).any() or len(np.unique(edges)) < len(edges):
+        raise ValueError(f"Bin edges must be unique: {edges!r}.")
+    return pd.cut(df[col], edges, labels=labels, include_lowest=True), sketch.rank_error
+
+
+def approximate_top_values(df, col, n=10):
+    return column_sketch(df, col, "top").top(n)
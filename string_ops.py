@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from parallel import map_columns
+
+STRING_METHODS = {"lower": str.lower, "upper": str.upper, "strip": str.strip}
+
+
+def _apply_to_strings(values, operation):
+    """Apply the operation to the str items only; nulls and other values pass through unchanged."""
+    method = STRING_METHODS[operation]
+    return [method(value) if isinstance(value, str) else value for value in values]
+
+
+def _transform_categorical(series, operation):
+    # Only the categories are rewritten; the codes are reused as they are
+    categories = series.cat.categories
+    renamed = pd.Index(_apply_to_strings(categories, operation), dtype=categories.dtype)
+    if renamed.is_unique:
+        return series.cat.rename_categories(renamed)
+    # Categories that now coincide ("A" and "a" lowered) are merged into one
+    merged = renamed.unique()
+    mapping = merged.get_indexer(renamed)
+    codes = series.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, mapping[codes], -1)
+    categorical = pd.Categorical.from_codes(codes, categories=merged, ordered=series.cat.ordered)
+    return pd.Series(categorical, index=series.index, name=series.name)
+
+
+def _transform_object(series, operation):
+    if pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty"):
+        return getattr(series.str, operation)()
+    # Mixed columns keep their non-string values instead of losing them to NaN
+    return pd.Series(_apply_to_strings(series.to_numpy(), operation), index=series.index, name=series.name, dtype=object)
+
+
+def transform_strings(series, operation):
+    """
+    lower, upper or strip a text column without changing its dtype or nulls.
+    Categoricals only transform their categories; Arrow-backed strings go
+    through .str, which runs pyarrow.compute kernels (utf8_lower, ...) on them.
+    Non-text columns are returned unchanged.
+    """
+    if operation not in STRING_METHODS:
+        raise ValueError(f"Unknown string operation: {operation}")
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return _transform_categorical(series, operation)
+    if pd.api.types.is_object_dtype(dtype):
+        return _transform_object(series, operation)
+    if pd.api.types.is_string_dtype(dtype):
+        return getattr(series.str, operation)()
+    return series
+
+
+def is_text_column(series):
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pd.api.types.infer_dtype(dtype.categories, skipna=True) == "string"
+    return pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+
+
+def text_columns(df):
+    return [col for col in df.columns if is_text_column(df[col])]
+
+
+def transform_string_columns(df, operation, columns, max_workers=None):
+    """Transformed column per name, with columns processed on a thread pool."""
+    return map_columns(lambda df, col: transform_strings(df[col], operation), df, columns, max_workers=max_workers)
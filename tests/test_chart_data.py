@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from chart_data import LINE_POINT_BUDGET, pre_aggregate, reduce_points
+
+DRAW = {"Bar": px.bar, "Funnel": px.funnel, "Histogram": px.histogram}
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "cat": rng.choice(["a", "b", "c"], 300),
+        "value": rng.random(300),
+        "year": rng.choice([2020, 2021], 300),
+        "group": rng.choice(["g1", "g2"], 300),
+    })
+
+
+@pytest.mark.parametrize("chart_type", ["Bar", "Funnel", "Histogram"])
+def test_animation_group_survives_aggregation(frame, chart_type):
+    params = {"x": "cat", "y": "value", "animation_frame": "year", "animation_group": "group"}
+    if chart_type == "Histogram":
+        params = {"x": "value", "animation_frame": "year", "animation_group": "group"}
+    result, kept, draw = pre_aggregate(frame, chart_type, params)
+    assert "group" in result.columns
+    DRAW.get(draw, px.bar)(result, **kept)
+
+
+def test_pie_with_animation_group_keeps_column(frame):
+    result, kept, _ = pre_aggregate(frame, "Pie", {"names": "cat", "values": "value", "animation_group": "group"})
+    assert "group" in result.columns
+    assert np.isclose(result["value"].sum(), frame["value"].sum())
+
+
+def test_row_labels_skip_aggregation(frame):
+    params = {"x": "cat", "y": "value", "hover_name": "group"}
+    result, kept, draw = pre_aggregate(frame, "Bar", params)
+    assert result is frame and kept is params and draw == "Bar"
+
+
+def test_stacked_area_traces_keep_the_same_x_values():
+    rng = np.random.default_rng(0)
+    x = np.tile(np.arange(10_000), 4)
+    df = pd.DataFrame({
+        "x": x,
+        "y": rng.random(len(x)) + np.repeat(np.arange(4), 10_000),
+        "series": np.repeat(["a", "b", "c", "d"], 10_000),
+    })
+    reduced, note = reduce_points(df, "Area", {"x": "x", "y": "y", "color": "series"})
+    assert note is not None and len(reduced) <= LINE_POINT_BUDGET
+    x_sets = [set(group["x"]) for _, group in reduced.groupby("series")]
+    assert all(xs == x_sets[0] for xs in x_sets)
+    assert {0, 9_999} <= x_sets[0]
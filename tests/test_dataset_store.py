@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dataset_store import DatasetStore
+
+
+def test_recipe_replaces_the_parent_recipe():
+    store = DatasetStore()
+    store.commit(pd.DataFrame({"a": [1]}))
+    store.commit(pd.DataFrame({"a": [2]}), steps=[{"op": "A"}])
+    store.commit(pd.DataFrame({"b": [3]}), recipe=[{"op": "OOC1"}])
+    assert store.recipe == [{"op": "OOC1"}]
+    store.commit(pd.DataFrame({"b": [4]}), steps=[{"op": "B"}])
+    assert store.recipe == [{"op": "OOC1"}, {"op": "B"}]
@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fingerprints import duplicate_groups, duplicated_mask
+
+
+FRAMES = [
+    pd.DataFrame({"a": [1, "1", 1, 2], "b": ["x", "x", "x", "y"]}),
+    pd.DataFrame({"a": [0.0, -0.0, np.nan, -np.nan], "b": ["x", "x", "z", "z"]}),
+    pd.DataFrame({"a": [None, np.nan, "q", "q"], "b": [1, 1, 2, 3]}),
+    pd.DataFrame({"a": pd.Categorical(["u", "v", "u", "u"]), "b": [1.5, 1.5, 1.5, 1.5]}),
+]
+
+
+@pytest.mark.parametrize("df", FRAMES)
+@pytest.mark.parametrize("keep", ["first", "last", False])
+def test_matches_pandas_duplicated(df, keep):
+    expected = df.duplicated(keep=keep).to_numpy()
+    assert np.array_equal(duplicated_mask(df, keep=keep), expected)
+
+
+def test_random_frame_matches_pandas_duplicated():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "i": rng.integers(0, 5, 5000),
+        "f": rng.choice([0.0, -0.0, 1.5, np.nan], 5000),
+        "s": rng.choice(["a", "b", 1, None], 5000),
+    })
+    for keep in ("first", "last", False):
+        assert np.array_equal(duplicated_mask(df, keep=keep), df.duplicated(keep=keep).to_numpy())
+
+
+def test_groups_count_equal_rows():
+    df = pd.DataFrame({"a": [0.0, -0.0, 1.0], "b": ["x", "x", "x"]})
+    groups = duplicate_groups(df)
+    assert groups["Count"].tolist() == [2]
+
+
+def test_fingerprint_collisions_are_not_reported(monkeypatch):
+    import fingerprints
+    # Every row gets the same fingerprint, as if all of them collided
+    monkeypatch.setattr(fingerprints, "row_fingerprints", lambda df, columns=None: np.zeros(len(df), dtype=np.uint64))
+    df = pd.DataFrame({"a": [1, 2, 1, 3, 2], "b": ["x", "y", "x", "z", "q"]})
+    for keep in ("first", "last", False):
+        assert np.array_equal(duplicated_mask(df, keep=keep), df.duplicated(keep=keep).to_numpy())
+    groups = duplicate_groups(df)
+    assert groups[["a", "b"]].values.tolist() == [[1, "x"]]
+    assert groups["Count"].tolist() == [2]
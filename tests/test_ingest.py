@@ -0,0 +1,36 @@
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ingest import iter_csv_chunks, read_csv_chunked
+
+
+def _late_text_csv():
+    df = pd.DataFrame({"id": range(30_000), "notes": [""] * 20_000 + ["late text"] * 10_000})
+    return io.BytesIO(df.to_csv(index=False).encode())
+
+
+def test_text_after_empty_sample_is_read():
+    df = read_csv_chunked(_late_text_csv(), chunksize=5_000, sample_rows=10_000)
+    assert len(df) == 30_000
+    assert df["notes"].iloc[-1] == "late text"
+    assert df["notes"].iloc[:20_000].isna().all()
+
+
+def test_chunk_iterator_reads_text_after_empty_sample():
+    chunks = list(iter_csv_chunks(_late_text_csv(), chunksize=5_000, sample_rows=10_000))
+    assert sum(len(chunk) for chunk in chunks) == 30_000
+    assert chunks[-1]["notes"].iloc[-1] == "late text"
+
+
+def test_no_chunks_from_a_path(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n1,2\n")
+    df = read_csv_chunked(str(path), nrows=0)
+    assert list(df.columns) == ["a", "b"] and df.empty
+    df = read_csv_chunked(io.BytesIO(b"a,b\n1,2\n"), nrows=0)
+    assert list(df.columns) == ["a", "b"] and df.empty
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cleaning_operations import OP_MAP1
+from null_index import missing_summary, null_counts, null_frame, rows_with_nulls
+
+
+def _repeated_labels():
+    return pd.DataFrame([[1, np.nan, 3], [4, 5, 6]], columns=["a", "b", "a"]).assign(c=[np.nan, 1.0])
+
+
+def test_counts_follow_column_positions():
+    df = _repeated_labels()
+    df.columns = ["a", "b", "a", "a"]
+    assert null_counts(df).tolist() == df.isna().sum().tolist()
+    assert null_counts(df, ["a"]).tolist() == [0, 0, 1]
+
+
+def test_drop_empty_columns_with_repeated_labels():
+    df = _repeated_labels()
+    result = OP_MAP1["Removing Missing Values"]["Drop Empty Columns"](df)
+    expected = df.dropna(axis=1)
+    assert list(result.columns) == list(expected.columns)
+    assert np.array_equal(result.to_numpy(), expected.to_numpy())
+
+
+def test_row_masks_and_frames_with_repeated_labels():
+    df = _repeated_labels()
+    assert np.array_equal(rows_with_nulls(df), df.isna().any(axis=1).to_numpy())
+    assert np.array_equal(rows_with_nulls(df, how="all"), df.isna().all(axis=1).to_numpy())
+    assert null_frame(df).equals(df.isna())
+    assert missing_summary(df)["Missing_Count"].tolist() == df.isna().sum().tolist()
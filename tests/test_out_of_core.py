@@ -0,0 +1,112 @@
+import gc
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import out_of_core
+from out_of_core import PartitionedDataset, apply_step, open_dataset, remove_stale_datasets, resolve_path
+from recipe import make_step
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    inputs = tmp_path / "inputs"
+    inputs.mkdir()
+    monkeypatch.setattr(out_of_core, "OUT_OF_CORE_INPUT_DIR", str(inputs))
+    monkeypatch.setattr(out_of_core, "OUT_OF_CORE_EXPORT_DIR", str(tmp_path / "exports"))
+    return tmp_path, inputs
+
+
+def test_paths_outside_the_root_are_rejected(tmp_path):
+    assert resolve_path(tmp_path, "a/b.csv") == os.path.realpath(tmp_path / "a" / "b.csv")
+    for name in ("../secret.csv", "/etc/passwd", "a/../../x", "."):
+        with pytest.raises(ValueError):
+            resolve_path(tmp_path, name)
+
+
+def test_open_reads_only_input_files(dirs):
+    root, inputs = dirs
+    pd.DataFrame({"a": range(10)}).to_csv(inputs / "data.csv", index=False)
+    dataset = open_dataset("data.csv", "data.csv", partition_rows=4, root=str(root))
+    assert dataset.shape == (10, 1)
+    outside = root / "outside.csv"
+    pd.DataFrame({"a": [1]}).to_csv(outside, index=False)
+    with pytest.raises(ValueError):
+        open_dataset(str(outside), str(outside), root=str(root))
+
+
+def test_export_stays_in_export_dir(dirs):
+    root, _ = dirs
+    dataset = PartitionedDataset.write([pd.DataFrame({"a": [1.0, np.nan]})], root=str(root))
+    path = out_of_core.export_dataset(dataset, "out.parquet", "parquet")
+    assert pd.read_parquet(path)["a"].iloc[0] == 1.0
+    with pytest.raises(ValueError):
+        out_of_core.export_dataset(dataset, "../escape.csv", "csv")
+
+
+def test_partitions_are_removed_with_the_dataset(tmp_path):
+    dataset = PartitionedDataset.write([pd.DataFrame({"a": [1.0, np.nan]})], root=str(tmp_path))
+    filled = apply_step(dataset, make_step("clean", "Filling Missing Values", "Fill with 0"))
+    paths = [dataset.path, filled.path]
+    del dataset, filled
+    gc.collect()
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_stale_dataset_dirs_are_swept(tmp_path):
+    stale = tmp_path / ("0" * 32)
+    stale.mkdir()
+    (tmp_path / "exports").mkdir()
+    os.utime(stale, (0, 0))
+    os.utime(tmp_path / "exports", (0, 0))
+    remove_stale_datasets(str(tmp_path), max_age_hours=1)
+    assert not stale.exists() and (tmp_path / "exports").exists()
+
+
+def _drifting_dataset(root):
+    # Every column is missing in the first partition, so it reads back with another dtype there
+    first = pd.DataFrame({"t": [None] * 3, "n": [None] * 3, "d": pd.Series([None] * 3, dtype=object)})
+    second = pd.DataFrame({
+        "t": ["a ", "B", "c"],
+        "n": [1.0, 4.0, 9.0],
+        "d": pd.to_datetime(["2020-01-02", "2021-03-04", "2022-05-06"]),
+    })
+    return PartitionedDataset.write([first, second], root=str(root))
+
+
+@pytest.mark.parametrize("kind, group, op, params", [
+    ("transform", "String Transformations", "Convert to Uppercase", {}),
+    ("transform", "Mathematical Transformations", "Square Root Transform", {"inplace": False}),
+    ("transform", "Datetime Transformation", "Extract Date Components", {}),
+    ("clean", "String Cleaning", "Strip Whitespace", {}),
+])
+def test_dtype_driven_ops_give_every_partition_the_same_columns(tmp_path, kind, group, op, params):
+    dataset = _drifting_dataset(tmp_path)
+    result = apply_step(dataset, make_step(kind, group, op, **params))
+    frame = result.to_pandas()
+    assert list(frame.columns) == result.columns
+    assert [field.name for field in result.schema()] == result.columns
+    exported = tmp_path / "out.parquet"
+    result.to_parquet(str(exported))
+    assert list(pd.read_parquet(exported).columns) == result.columns
+    assert len({tuple(part.columns) for part in result.iter_partitions()}) == 1
+
+
+def test_write_rejects_partitions_with_other_columns(tmp_path):
+    with pytest.raises(ValueError):
+        PartitionedDataset.write([pd.DataFrame({"a": [1]}), pd.DataFrame({"a": [1], "b": [2]})], root=str(tmp_path))
+    assert not any(entry.is_dir() for entry in os.scandir(tmp_path))
+
+
+def test_head_reads_the_leading_rows_once(tmp_path):
+    df = pd.DataFrame({"a": np.arange(50_000), "s": ["x"] * 50_000})
+    dataset = PartitionedDataset.write([df.iloc[:30_000], df.iloc[30_000:]], root=str(tmp_path))
+    head = dataset.head(10)
+    assert head.equals(df.head(10))
+    assert dataset.head(10) is head
@@ -0,0 +1,40 @@
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import perf
+
+
+def test_memory_is_not_traced_by_default():
+    records = []
+    perf.set_recorder(records)
+    with perf.measure("op", "alloc"):
+        assert not tracemalloc.is_tracing()
+    assert records[0]["peak_mb"] is None
+
+
+def test_tracing_started_by_measure_is_stopped():
+    records = []
+    perf.set_recorder(records, trace_memory=True)
+    with perf.measure("op", "alloc"):
+        assert tracemalloc.is_tracing()
+        data = bytearray(4 * 1024 * 1024)
+    del data
+    assert not tracemalloc.is_tracing()
+    assert records[0]["peak_mb"] >= 4
+
+
+def test_tracing_started_elsewhere_keeps_running():
+    records = []
+    perf.set_recorder(records, trace_memory=True)
+    tracemalloc.start()
+    try:
+        with perf.measure("op", "alloc"):
+            pass
+        assert tracemalloc.is_tracing()
+        assert records[0]["peak_mb"] is None
+    finally:
+        tracemalloc.stop()
+    perf.set_recorder(None)
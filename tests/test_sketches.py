@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from sketches import HyperLogLog, _value_hashes, approximate_qcut
+
+HASH_SCRIPT = "from sketches import _value_hashes; print(_value_hashes(['alpha', 'beta', 3]).tolist())"
+
+
+def test_string_hashes_do_not_depend_on_the_process():
+    outputs = set()
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        result = subprocess.run([sys.executable, "-c", HASH_SCRIPT], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True)
+        outputs.add(result.stdout)
+    assert len(outputs) == 1
+
+
+def test_mixed_types_hash_apart():
+    hashes = _value_hashes(pd.Series([1, "1"], dtype=object))
+    assert hashes[0] != hashes[1]
+
+
+def test_merged_sketches_match_whole_column():
+    values = pd.Series([f"v{i % 5000}" for i in range(40_000)], dtype=object)
+    whole = HyperLogLog().update(values)
+    merged = HyperLogLog().update(values[:20_000]).merge(HyperLogLog().update(values[20_000:]))
+    assert np.array_equal(whole.registers, merged.registers)
+    assert abs(merged.estimate() - 5000) < 5000 * 4 * merged.relative_error
+
+
+def test_approximate_qcut_reports_rank_error():
+    df = pd.DataFrame({"x": np.random.default_rng(0).normal(size=50_000)})
+    bins, rank_error = approximate_qcut(df, "x", 4, labels=["Q1", "Q2", "Q3", "Q4"])
+    assert 0 <= rank_error < 0.05
+    shares = bins.value_counts(normalize=True)
+    assert np.all(np.abs(shares - 0.25) <= 2 * rank_error + 1e-9)
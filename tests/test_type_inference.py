@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from type_inference import convert_column, convert_inferred
+
+
+def test_decimal_outside_sample_is_not_truncated():
+    values = [str(i) for i in range(200_000)]
+    values[-1] = "7.9"
+    df = pd.DataFrame({"n": values})
+    result = convert_inferred(df)
+    assert result["n"].dtype.kind == "f"
+    assert result["n"].iloc[-1] == 7.9
+    assert result["n"].iloc[0] == 0
+
+
+def test_whole_numbers_become_integers():
+    converted, failed = convert_column(pd.Series(["1", "2.0", "30"]), "int")
+    assert converted.dtype.kind in "iu"
+    assert converted.tolist() == [1, 2, 30]
+    assert not failed.any()
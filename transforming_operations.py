@@ -1,8 +1,11 @@
 import pandas as pd
-import streamlit as st
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler, StandardScaler
-from utils import enhanced_sanitize_dataframe_for_streamlit
+from frame_utils import enhanced_sanitize_dataframe_for_streamlit, notify
+from column_stats import column_kind, column_stat, is_numeric
+from parallel import map_columns
+from sketches import approximate_qcut
+from string_ops import text_columns, transform_string_columns
+from type_inference import MIN_SUCCESS_RATIO, convert_inferred
 
 TRANSFORM_OPS = [
     "Mathematical Transformations", "Feature Scaling", "Encoding Categorical Variables",
@@ -10,125 +13,171 @@ TRANSFORM_OPS = [
     "String Transformations", "Type Conversion", "Create a New Column"
 ]
 
+def _widen(series):
+    """Promote compacted numeric columns back to 64-bit before arithmetic so results cannot overflow."""
+    if pd.api.types.is_integer_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+        return series.astype(np.int64) if series.dtype.itemsize < 8 and series.dtype != np.uint64 else series
+    if pd.api.types.is_float_dtype(series) and series.dtype != np.float64:
+        return series.astype(np.float64)
+    return series
+
+def _math_column(df, col, operation):
+    values = _widen(df[col])
+    if operation == 'log':
+        return np.log(values + 1)
+    if operation == 'sqrt':
+        return np.sqrt(values.abs())
+    if operation == 'square':
+        return values ** 2
+    return None
+
 def math_transformations(df, operation, columns=None, inplace=True):
-    result = df.copy()
+    result = df.copy(deep=False)
     target_cols = columns if columns else result.select_dtypes(include=[np.number]).columns
 
-    for col in target_cols:
-        try:
-            if operation == 'log':
-                transformed = np.log(result[col] + 1)
-            elif operation == 'sqrt':
-                transformed = np.sqrt(result[col].abs())
-            elif operation == 'square':
-                transformed = result[col] ** 2
-            else:
-                continue
-
+    transformed = map_columns(_math_column, df, target_cols, operation, return_exceptions=True)
+    for col, values in transformed.items():
+        if isinstance(values, Exception):
+            notify(f"Failed to transform column '{col}': {values}")
+        elif values is not None:
             if inplace:
-                result[col] = transformed
+                result[col] = values
             else:
-                result[f"{operation}_{col}"] = transformed
-        except Exception as e:
-            st.warning(f"Failed to transform column '{col}': {e}")
+                result[f"{operation}_{col}"] = values
 
     return enhanced_sanitize_dataframe_for_streamlit(result)
 
+def _scale_column(df, col, method):
+    """MinMaxScaler / StandardScaler arithmetic on one column, with its statistics read from column_stats."""
+    # Like scikit-learn, anything that converts to float can be scaled
+    values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    if np.isinf(values).any():
+        raise ValueError(f"column '{col}' contains infinity")
+    names = ("min", "max") if method == 'minmax' else ("mean", "std")
+    if is_numeric(df, col):
+        first, second = (column_stat(df, col, name) for name in names)
+    else:
+        first, second = (float(getattr(np, f"nan{name}")(values)) for name in names)
+    return scale_values(values, method, first, second)
+
+def scale_values(values, method, first, second):
+    """Scale float values given (min, max) for 'minmax' or (mean, std) for 'standard'."""
+    tiny = 10 * np.finfo(np.float64).eps
+    if method == 'minmax':
+        # Constant columns keep a scale of 1, as in scikit-learn
+        scale = 1.0 / (second - first if second - first >= tiny else 1.0)
+        return values * scale - first * scale
+    return (values - first) / (second if second >= tiny * max(abs(first), 1.0) else 1.0)
+
 def scaling_operations(df, method, columns=None, inplace=True):
-    result = df.copy()
-    target_cols = columns if columns else result.select_dtypes(include=[np.number]).columns
+    result = df.copy(deep=False)
+    target_cols = list(columns) if columns else [col for col in result.columns if is_numeric(df, col)]
 
-    if result[target_cols].empty:
-        st.warning("No numeric columns found for scaling.")
+    if not target_cols or result.empty:
+        notify("No numeric columns found for scaling.")
         return enhanced_sanitize_dataframe_for_streamlit(df)
 
-    if method == 'minmax':
-        scaler = MinMaxScaler()
-    else:
-        scaler = StandardScaler()
-
     try:
-        scaled_data = scaler.fit_transform(result[target_cols])
-        if inplace:
-            result[target_cols] = scaled_data
-        else:
-            for idx, col in enumerate(target_cols):
-                result[f"{method}_scaled_{col}"] = scaled_data[:, idx]
+        scaled_data = map_columns(_scale_column, df, target_cols, method)
+        for col, scaled in scaled_data.items():
+            result[col if inplace else f"{method}_scaled_{col}"] = scaled
     except Exception as e:
-        st.warning(f"Scaling failed: {e}")
+        notify(f"Scaling failed: {e}")
 
     return enhanced_sanitize_dataframe_for_streamlit(result)
 
 def create_new_column(df, col1, col2, operation, new_col):
-    result = df.copy()
+    result = df.copy(deep=False)
 
-    if not (np.issubdtype(result[col1].dtype, np.number) and np.issubdtype(result[col2].dtype, np.number)):
-        st.error("Operation can be performed only between 2 numeric columns")
+    if not (is_numeric(df, col1) and is_numeric(df, col2)):
+        notify("Operation can be performed only between 2 numeric columns", "error")
         return enhanced_sanitize_dataframe_for_streamlit(result)
 
+    left, right = _widen(result[col1]), _widen(result[col2])
     try:
         if operation == '+':
-            result[new_col] = result[col1] + result[col2]
+            result[new_col] = left + right
         elif operation == '-':
-            result[new_col] = result[col1] - result[col2]
+            result[new_col] = left - right
         elif operation == '*':
-            result[new_col] = result[col1] * result[col2]
+            result[new_col] = left * right
         elif operation == '/':
-            result[new_col] = result[col1] / result[col2]
+            result[new_col] = left / right
         else:
-            st.error(f"Unsupported operation: {operation}")
+            notify(f"Unsupported operation: {operation}", "error")
     except Exception as e:
-        st.error(f"Error while creating new column: {e}")
+        notify(f"Error while creating new column: {e}", "error")
 
     return enhanced_sanitize_dataframe_for_streamlit(result)
 
 def convert_str_int_columns(df, columns=None):
-    result = df.copy()
-    target_cols = columns if columns else result.columns
+    target_cols = columns if columns else df.columns
+    # Columns converted in parallel; a few bad cells become missing instead of failing the column
+    result = convert_inferred(df, columns=columns, kinds=("int", "float"))
 
     for col in target_cols:
-        try:
-            result[col] = pd.to_numeric(result[col], errors='raise')
-        except Exception as e:
-            st.warning(f"Column '{col}' could not be converted: {e}")
+        if column_kind(result, col) == "text":
+            notify(f"Column '{col}' could not be converted: fewer than {MIN_SUCCESS_RATIO:.0%} of sampled values are numeric")
 
     return enhanced_sanitize_dataframe_for_streamlit(result)
 
+def quantile_binning(df, q=4, labels=('Q1', 'Q2', 'Q3', 'Q4'), approximate=False):
+    """Quartile bins of the numeric columns; approximate edges come from each column's quantile sketch."""
+    numeric = df.select_dtypes(include=[np.number])
+    if not approximate:
+        return enhanced_sanitize_dataframe_for_streamlit(numeric.apply(lambda x: pd.qcut(x, q=q, labels=list(labels))))
+    binned = {}
+    for col in numeric.columns:
+        binned[col], rank_error = approximate_qcut(df, col, q, labels=list(labels))
+        notify(f"Column '{col}': approximate bin edges are within ±{rank_error:.2%} of the exact quantiles' ranks", level="info")
+    return enhanced_sanitize_dataframe_for_streamlit(pd.DataFrame(binned, index=df.index, columns=numeric.columns))
+
+def string_transformations(df, operation, columns=None):
+    """The text columns of df (categoricals included) with the string operation applied."""
+    string_cols = list(columns) if columns is not None else text_columns(df)
+    transformed = transform_string_columns(df, operation, string_cols)
+    return enhanced_sanitize_dataframe_for_streamlit(pd.DataFrame(transformed, index=df.index, columns=string_cols))
+
+def extract_date_components(df, columns=None):
+    """Year, month and day columns for each datetime column."""
+    date_cols = list(columns) if columns is not None else df.select_dtypes(include=["datetime64"]).columns
+    return enhanced_sanitize_dataframe_for_streamlit(
+    df.assign(**{
+        key: value
+        for col in date_cols
+        for key, value in {
+            f"{col}_year": df[col].dt.year,
+            f"{col}_month": df[col].dt.month,
+            f"{col}_day": df[col].dt.day
+        }.items()
+    })
+)
+
 OP_MAP2={
     "Mathematical Transformations": {
-        "Log Transform": lambda df, label="Log Transform": math_transformations(
-            df, 'log',
-            columns=st.session_state.get("selected_columns", []),
-            inplace=st.session_state.get(f"inplace_{label}", True)
+        "Log Transform": lambda df, columns=None, inplace=True: math_transformations(
+            df, 'log', columns=columns, inplace=inplace
         ),
-        "Square Root Transform": lambda df, label="Square Root Transform": math_transformations(
-            df, 'sqrt',
-            columns=st.session_state.get("selected_columns", []),
-            inplace=st.session_state.get(f"inplace_{label}", True)
+        "Square Root Transform": lambda df, columns=None, inplace=True: math_transformations(
+            df, 'sqrt', columns=columns, inplace=inplace
         ),
-        "Square Transform": lambda df, label="Square Transform": math_transformations(
-            df, 'square',
-            columns=st.session_state.get("selected_columns", []),
-            inplace=st.session_state.get(f"inplace_{label}", True)
+        "Square Transform": lambda df, columns=None, inplace=True: math_transformations(
+            df, 'square', columns=columns, inplace=inplace
         ),
     },
 
     "Feature Scaling": {
-        "Min-Max Scaling": lambda df, label="Min-Max Scaling": scaling_operations(
-            df, 'minmax',
-            columns=st.session_state.get("selected_columns", []),
-            inplace=st.session_state.get(f"inplace_{label}", True)
+        "Min-Max Scaling": lambda df, columns=None, inplace=True: scaling_operations(
+            df, 'minmax', columns=columns, inplace=inplace
         ),
-        "Standard Scaling (Z-score)": lambda df, label="Standard Scaling (Z-score)": scaling_operations(
-            df, 'standard',
-            columns=st.session_state.get("selected_columns", []),
-            inplace=st.session_state.get(f"inplace_{label}", True)
+        "Standard Scaling (Z-score)": lambda df, columns=None, inplace=True: scaling_operations(
+            df, 'standard', columns=columns, inplace=inplace
         ),
     },
 
     "Encoding Categorical Variables": {
         "Label Encoding": lambda df: enhanced_sanitize_dataframe_for_streamlit(
-            df.select_dtypes(include=['object', 'category']).apply(lambda x: pd.Categorical(x).codes)
+            df.select_dtypes(include=['object', 'string', 'category']).apply(lambda x: pd.Categorical(x).codes)
         ),
         "One-Hot Encoding": lambda df: enhanced_sanitize_dataframe_for_streamlit(
             pd.get_dummies(df, prefix_sep='_')
@@ -141,11 +190,7 @@ OP_MAP2={
                 lambda x: pd.cut(x, bins=5, labels=['Very Low', 'Low', 'Medium', 'High', 'Very High'])
             )
         ),
-        "Quantile Binning": lambda df: enhanced_sanitize_dataframe_for_streamlit(
-            df.select_dtypes(include=[np.number]).apply(
-                lambda x: pd.qcut(x, q=4, labels=['Q1', 'Q2', 'Q3', 'Q4'])
-            )
-        ),
+        "Quantile Binning": lambda df, approximate=False: quantile_binning(df, approximate=approximate),
     },
 
     "Column Operations": {
@@ -157,48 +202,32 @@ OP_MAP2={
        "Parse Dates": lambda df: enhanced_sanitize_dataframe_for_streamlit(
     df.assign(**{
         col: pd.to_datetime(df[col], errors="ignore")
-        for col in df.select_dtypes(include=["object"]).columns
+        for col in df.select_dtypes(include=["object", "string"]).columns
     })),
 
-    "Extract Date Components": lambda df: enhanced_sanitize_dataframe_for_streamlit(
-    df.assign(**{
-        key: value
-        for col in df.select_dtypes(include=["datetime64"]).columns
-        for key, value in {
-            f"{col}_year": df[col].dt.year,
-            f"{col}_month": df[col].dt.month,
-            f"{col}_day": df[col].dt.day
-        }.items()
-    })
-)
+    "Extract Date Components": lambda df: extract_date_components(df),
 
     },
     "Create a New Column": {
-        "Create Custom Column": lambda df: create_new_column(
+        "Create Custom Column": lambda df, col1=None, col2=None, operation=None, new_col=None: create_new_column(
     df,
-    col1=st.session_state.get("col1"),
-    col2=st.session_state.get("col2"),
-    operation=st.session_state.get("operation"),
-    new_col=st.session_state.get("new_col_name")
+    col1=col1,
+    col2=col2,
+    operation=operation,
+    new_col=new_col
 )
 
     },
 
     "Type Conversion": {
-        "Convert String Integers to Int": lambda df: convert_str_int_columns(
-            df, columns=st.session_state.get("selected_columns", [])
+        "Convert String Integers to Int": lambda df, columns=None: convert_str_int_columns(
+            df, columns=columns
         )
     },
 
     "String Transformations": {
-        "Convert to Uppercase": lambda df: enhanced_sanitize_dataframe_for_streamlit(
-            df.select_dtypes(include=['object']).apply(lambda x: x.str.upper())
-        ),
-        "Convert to Lowercase": lambda df: enhanced_sanitize_dataframe_for_streamlit(
-            df.select_dtypes(include=['object']).apply(lambda x: x.str.lower())
-        ),
-    "Remove Whitespace": lambda df: enhanced_sanitize_dataframe_for_streamlit(
-        df.select_dtypes(include=['object']).apply(lambda x: x.str.strip())
-    )
-}
+        "Convert to Uppercase": lambda df: string_transformations(df, 'upper'),
+        "Convert to Lowercase": lambda df: string_transformations(df, 'lower'),
+        "Remove Whitespace": lambda df: string_transformations(df, 'strip'),
+    }
 }
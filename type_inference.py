@@ -0,0 +1,175 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from frame_utils import notify
+from ingest import downcast_numeric
+from parallel import map_columns
+
+INFERENCE_SAMPLE_ROWS = 10_000
+# Share of sampled values that must parse before a column is converted
+MIN_SUCCESS_RATIO = 0.9
+CATEGORY_RATIO = 0.5
+
+TRUE_TOKENS = {"true", "t", "yes", "y"}
+FALSE_TOKENS = {"false", "f", "no", "n"}
+
+INFERENCE_COLUMNS = ["Column", "Current_Type", "Inferred_Type", "Success_Ratio", "Sample_Rows"]
+
+
+def _is_text(series):
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _present_mask(series):
+    """Values that are not missing; the sanitizer stores missing text as empty strings."""
+    present = series.notna()
+    if _is_text(series):
+        present &= series.ne("")
+    return present.to_numpy(dtype=bool)
+
+
+def _parse(values, inferred):
+    """values parsed as the inferred type; values that do not parse come back missing."""
+    if inferred in ("int", "float"):
+        return pd.to_numeric(values, errors="coerce")
+    if inferred == "bool":
+        tokens = values.astype(str).str.strip().str.lower()
+        parsed = pd.Series(pd.NA, index=values.index, dtype="boolean")
+        parsed[tokens.isin(TRUE_TOKENS)] = True
+        parsed[tokens.isin(FALSE_TOKENS)] = False
+        return parsed
+    if inferred == "datetime":
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return pd.to_datetime(values, errors="coerce", format="mixed")
+    raise ValueError(f"Cannot parse values as {inferred}")
+
+
+def infer_column_type(series, sample_rows=INFERENCE_SAMPLE_ROWS, seed=0):
+    """
+    Classify a text column from the present values of a random sample as
+    bool, int, float, datetime, category or text. Returns the inferred type
+    and the share of sampled values that parse as it.
+    """
+    if not _is_text(series):
+        return str(series.dtype), 1.0, int(series.notna().sum())
+    sample = series.sample(sample_rows, random_state=seed) if len(series) > sample_rows else series
+    sample = sample[_present_mask(sample)]
+    if not len(sample):
+        return "text", 1.0, 0
+    best, best_ratio = None, 0.0
+    for candidate in ("bool", "float", "datetime"):
+        # Date parsing goes value by value, so free text is ruled out on a few values first
+        if candidate == "datetime" and _parse(sample.iloc[:100], candidate).notna().mean() < 0.5:
+            continue
+        ratio = float(_parse(sample, candidate).notna().mean())
+        if ratio > best_ratio:
+            best, best_ratio = candidate, ratio
+    if best_ratio >= MIN_SUCCESS_RATIO:
+        if best == "float":
+            numbers = _parse(sample, "float").dropna()
+            if np.all(np.mod(numbers, 1) == 0):
+                best = "int"
+        return best, best_ratio, len(sample)
+    if sample.nunique() <= CATEGORY_RATIO * len(sample):
+        return "category", 1.0, len(sample)
+    return "text", 1.0, len(sample)
+
+
+def infer_types(df, columns=None, sample_rows=INFERENCE_SAMPLE_ROWS):
+    """One row per column with its current dtype, the inferred type and the sample success ratio."""
+    target_cols = columns if columns else df.columns
+    rows = []
+    for col in target_cols:
+        inferred, ratio, sampled = infer_column_type(df[col], sample_rows)
+        rows.append({
+            "Column": col,
+            "Current_Type": str(df[col].dtype),
+            "Inferred_Type": inferred,
+            "Success_Ratio": round(ratio, 4),
+            "Sample_Rows": sampled,
+        })
+    return pd.DataFrame(rows, columns=INFERENCE_COLUMNS)
+
+
+def convert_column(series, inferred):
+    """
+    Convert a column to the narrowest dtype of its inferred type.
+    Returns the converted column and a mask of present values that failed to parse.
+    """
+    if inferred == "category":
+        return series.astype("category"), np.zeros(len(series), dtype=bool)
+    if _is_text(series):
+        # Every distinct value is parsed once and spread back over the rows
+        codes, uniques = pd.factorize(series)
+        parsed = _parse(pd.Series(uniques, dtype=object), inferred)
+        values = parsed.array if isinstance(parsed.dtype, pd.api.extensions.ExtensionDtype) else parsed.to_numpy()
+        parsed = pd.Series(pd.api.extensions.take(values, codes, allow_fill=True), index=series.index, name=series.name)
+    else:
+        parsed = _parse(series, inferred)
+    missing = parsed.isna().to_numpy()
+    complete = not missing.any()
+    failed = _present_mask(series) & missing if not complete else np.zeros(len(series), dtype=bool)
+    if inferred == "bool" and complete:
+        parsed = parsed.astype(bool)
+    elif inferred in ("int", "float"):
+        # The sample may have missed decimals, so the int decision is made again on every value
+        if inferred == "int" and complete and np.all(np.mod(parsed.to_numpy(), 1) == 0):
+            # "1.0"-style integers parse as floats
+            parsed = parsed.astype(np.int64)
+        parsed = downcast_numeric(parsed)
+    return parsed, failed
+
+
+def _conversions(df, columns, min_ratio):
+    """Columns whose sample parses well enough, each with the type to convert it to."""
+    plan = {}
+    for col in columns:
+        if not _is_text(df[col]):
+            continue
+        inferred, ratio, _ = infer_column_type(df[col])
+        if inferred != "text" and ratio >= min_ratio:
+            plan[col] = inferred
+    return plan
+
+
+def _convert_all(df, plan):
+    """Convert the planned columns on a thread pool; returns {column: (converted, failed mask)}."""
+    return map_columns(lambda df, col: convert_column(df[col], plan[col]), df, plan)
+
+
+def convert_inferred(df, columns=None, errors="coerce", kinds=None, min_ratio=MIN_SUCCESS_RATIO):
+    """
+    Convert text columns to their inferred types. Values that fail to parse
+    are set to missing (errors="coerce") or their rows are removed from the
+    result (errors="quarantine"); either way the column is still converted.
+    kinds limits the conversion to some inferred types, e.g. ("int", "float").
+    """
+    target_cols = columns if columns else df.columns
+    plan = _conversions(df, target_cols, min_ratio)
+    if kinds is not None:
+        plan = {col: inferred for col, inferred in plan.items() if inferred in kinds}
+    result = df.copy(deep=False)
+    quarantined = np.zeros(len(df), dtype=bool)
+    for col, (converted, failed) in _convert_all(df, plan).items():
+        result[col] = converted
+        n_failed = int(failed.sum())
+        if n_failed:
+            notify(f"Column '{col}': {n_failed:,} of {len(df):,} values could not be read as {plan[col]}"
+                   + (" and their rows were quarantined" if errors == "quarantine" else " and were set to missing"))
+            quarantined |= failed
+    if errors == "quarantine" and quarantined.any():
+        result = result[~quarantined]
+    return result
+
+
+def failing_rows(df, columns=None, min_ratio=MIN_SUCCESS_RATIO):
+    """Rows holding a value that would not survive conversion to its column's inferred type."""
+    target_cols = columns if columns else df.columns
+    plan = _conversions(df, target_cols, min_ratio)
+    failed = np.zeros(len(df), dtype=bool)
+    for _, (_, mask) in _convert_all(df, plan).items():
+        failed |= mask
+    return df[failed]
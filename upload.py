@@ -1,20 +1,88 @@
 import streamlit as st
 import pandas as pd
-from utils import back_button, next_button, nav, enhanced_sanitize_dataframe_for_streamlit, safe_display_dataframe
+from utils import back_button, next_button, nav, safe_display_dataframe, set_dataframe, current_dataframe, set_out_of_core
+from ingest import load_dataset, read_header, file_format, STREAMING_THRESHOLD_MB
+from out_of_core import open_dataset, input_files, OUT_OF_CORE_INPUT_DIR, PARTITION_ROWS
 
 def upload_page():
     back_button("home")
     st.title("Upload your dataset")
-    uploaded = st.file_uploader("Choose your dataset", type=["csv", "xlsx"])
+    uploaded = st.file_uploader("Choose your dataset", type=["csv", "xlsx", "parquet", "feather", "arrow"])
     if uploaded:
         try:
-            if uploaded.name.endswith(".csv"):
-                df = pd.read_csv(uploaded)
-            else:
-                df = pd.read_excel(uploaded)
-            df = enhanced_sanitize_dataframe_for_streamlit(df)
-            st.session_state.df = df.copy()
+            size_mb = uploaded.size / (1024 * 1024)
+            fmt = file_format(uploaded.name)
+            filters = None
+            with st.expander("Load options", expanded=size_mb >= STREAMING_THRESHOLD_MB):
+                streaming = st.toggle(
+                    "Streaming mode (chunked read with compact dtypes)",
+                    value=size_mb >= STREAMING_THRESHOLD_MB and fmt == "csv",
+                    disabled=fmt != "csv",
+                    key="upload_streaming",
+                )
+                # The header only changes with the file, so reruns reuse it instead of reading the file again
+                header_key = (getattr(uploaded, "file_id", None), uploaded.name, uploaded.size)
+                cached_header = st.session_state.get("upload_header")
+                if cached_header is None or cached_header[0] != header_key:
+                    cached_header = (header_key, read_header(uploaded, uploaded.name))
+                    st.session_state.upload_header = cached_header
+                header = cached_header[1]
+                usecols = st.multiselect(
+                    "Columns to load (leave empty for all)",
+                    options=header,
+                    default=[],
+                    key="upload_usecols",
+                )
+                nrows = st.number_input("Maximum rows (0 for all)", min_value=0, value=0, step=100000, key="upload_nrows")
+                if fmt == "parquet":
+                    st.caption("Row filter (skips row groups that cannot match)")
+                    f1, f2, f3 = st.columns(3)
+                    with f1:
+                        filter_col = st.selectbox("Column", [None] + header, key="upload_filter_col")
+                    with f2:
+                        filter_op = st.selectbox("Operator", ["==", "!=", ">", ">=", "<", "<="], key="upload_filter_op")
+                    with f3:
+                        filter_value = st.text_input("Value", key="upload_filter_value")
+                    if filter_col and filter_value != "":
+                        try:
+                            filter_value = float(filter_value) if "." in filter_value else int(filter_value)
+                        except ValueError:
+                            pass
+                        filters = [(filter_col, filter_op, filter_value)]
+                compact = st.toggle("Optimize memory (compact dtypes)", value=True, key="upload_compact")
+                category_ratio = st.slider(
+                    "Convert text columns to category below this unique ratio",
+                    0.0, 1.0, 0.5, 0.05, key="upload_category_ratio", disabled=not compact,
+                )
+                arrow_strings = st.checkbox("Use Arrow-backed strings", value=True, key="upload_arrow_strings", disabled=not compact)
+
+            progress_bar = st.progress(0.0, text="Reading file...") if streaming else None
+
+            def report_progress(fraction, rows):
+                progress_bar.progress(fraction, text=f"Read {rows:,} rows")
+
+            df, upload_key, report = load_dataset(
+                uploaded, uploaded.name,
+                streaming=streaming, usecols=usecols, nrows=nrows, filters=filters,
+                compact=compact, category_ratio=category_ratio, arrow_strings=arrow_strings,
+                progress=report_progress if streaming else None,
+            )
+            if progress_bar is not None:
+                progress_bar.empty()
+            # Reruns with the same file keep the already loaded dataset
+            if st.session_state.get("upload_key") != upload_key:
+                set_dataframe(df, memory_bytes=report["after_bytes"] if report else None, label=f"Upload {uploaded.name}")
+                st.session_state.upload_key = upload_key
             st.success(f"Dataset loaded successfully! Shape: {df.shape}")
+            if report:
+                saved = report["before_bytes"] - report["after_bytes"]
+                st.info(
+                    f"Memory optimized: {report['before_bytes'] / 1024 ** 2:.1f} MB → "
+                    f"{report['after_bytes'] / 1024 ** 2:.1f} MB ({saved / max(report['before_bytes'], 1):.0%} saved)"
+                )
+                if report["columns"]:
+                    with st.expander("Memory report by column"):
+                        safe_display_dataframe(pd.DataFrame(report["columns"]))
             st.subheader("Dataset Preview")
             safe_display_dataframe(df.head(10))
             st.subheader("Dataset Info")
@@ -27,4 +95,23 @@ def upload_page():
                 st.write(df.dtypes.value_counts())
         except Exception as e:
             st.error(f"Error loading file: {str(e)}")
-    next_button("Next", "cleaning_menu", disabled=st.session_state.df is None)
\ No newline at end of file
+    with st.expander("Out-of-core mode (datasets larger than memory)"):
+        st.caption(
+            "The file is split into partitions on local disk and processed one partition at a time. "
+            f"Files too large to upload can be placed in {OUT_OF_CORE_INPUT_DIR} on the server."
+        )
+        local_path = st.selectbox("Server file (leave empty to use the uploaded file)", [None] + input_files(), key="out_of_core_source")
+        partition_rows = st.number_input("Rows per partition", min_value=10000, value=PARTITION_ROWS, step=100000, key="out_of_core_partition_rows")
+        if st.button("Open out-of-core", disabled=not (local_path or uploaded)):
+            try:
+                source, name = (local_path, local_path) if local_path else (uploaded, uploaded.name)
+                progress_bar = st.progress(0.0, text="Writing partitions...")
+
+                def report_partitions(fraction, rows):
+                    progress_bar.progress(fraction, text=f"Partitioned {rows:,} rows")
+
+                set_out_of_core(open_dataset(source, name, partition_rows=int(partition_rows), progress=report_partitions))
+                nav("out_of_core")
+            except Exception as e:
+                st.error(f"Error opening file: {str(e)}")
+    next_button("Next", "cleaning_menu", disabled=current_dataframe() is None)
\ No newline at end of file
@@ -1,5 +1,12 @@
 import streamlit as st
 import pandas as pd
+from cache import BoundedCache
+from dataset_store import DatasetStore, DEFAULT_HISTORY_DEPTH
+import perf
+from frame_utils import (
+    NULL_TOKENS, enhanced_sanitize_dataframe_for_streamlit, is_sanitized,
+    safe_excel_export, safe_columnar_export, set_notifier,
+)
 
 THEME_PRIMARY = "#007bff"
 BTN_STYLE = f"""
@@ -37,6 +44,24 @@ h1, h2, h3 {{
 </style>
 """
 
+def use_streamlit_notifications():
+    """Show warnings and errors raised inside the ops in the running Streamlit page."""
+    def show(message, level="warning"):
+        if level == "error":
+            st.error(message)
+        elif level == "info":
+            st.info(message)
+        else:
+            st.warning(message)
+    set_notifier(show)
+
+def use_perf_recorder():
+    """Record op, sanitize and chart timings of this run into the session."""
+    perf.set_recorder(
+        st.session_state.setdefault("perf_records", []),
+        trace_memory=st.session_state.get("perf_trace_memory", False),
+    )
+
 def nav(next_page):
     st.session_state.page = next_page
     st.rerun()
@@ -53,68 +78,73 @@ def next_button(label, target, disabled=False):
         if st.button(label, disabled=disabled):
             nav(target)
 
-def enhanced_sanitize_dataframe_for_streamlit(df):
-    """
-    Enhanced DataFrame sanitization to handle all Arrow incompatibility issues.
-    """
-    if df is None or df.empty:
-        return df
-    
-    df_clean = df.copy()
-    
-    # Handle each column individually with comprehensive type checking
-    for col in df_clean.columns:
-        col_dtype = str(df_clean[col].dtype)
-        
-        # Handle nullable integer types (Int64, Int32, etc.)
-        if col_dtype.startswith('Int') or 'Int' in col_dtype:
-            try:
-                # Convert to regular float64, handling NaN values
-                df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce').astype('float64')
-            except:
-                df_clean[col] = df_clean[col].astype(str)
-        
-        # Handle nullable boolean types
-        elif col_dtype == 'boolean':
-            try:
-                # Convert to string to avoid Arrow issues
-                df_clean[col] = df_clean[col].astype(str).replace('<NA>', 'Unknown')
-            except:
-                df_clean[col] = df_clean[col].astype(str)
-        
-        # Handle string/object columns with mixed types or None values
-        elif col_dtype == 'object':
-            try:
-                # Convert to string and handle various null representations
-                series = df_clean[col].astype(str)
-                series = series.replace(['nan', 'None', '<NA>', 'null', 'NULL', 'NaN'], '')
-                df_clean[col] = series
-            except:
-                df_clean[col] = 'Error'
-        
-        # Handle datetime with timezone issues
-        elif 'datetime' in col_dtype and 'tz' in col_dtype:
-            try:
-                df_clean[col] = df_clean[col].dt.tz_localize(None)
-            except:
-                df_clean[col] = df_clean[col].astype(str)
-        
-        # Handle category types
-        elif col_dtype == 'category':
-            try:
-                df_clean[col] = df_clean[col].astype(str)
-            except:
-                df_clean[col] = 'Category'
-    
-    # Final safety check - ensure no problematic dtypes remain
-    for col in df_clean.columns:
-        dtype_str = str(df_clean[col].dtype)
-        if (dtype_str.startswith('Int') or 
-            dtype_str == 'boolean' or 
-            'Int' in dtype_str):
-            df_clean[col] = df_clean[col].astype(str)
-    
-    return df_clean
+PREVIEW_PAGE_SIZES = [50, 100, 500, 1000]
+PREVIEW_MAX_COLUMNS = 50
+PREVIEW_CACHE = BoundedCache(128 * 1024 * 1024)
+
+def dataset_store():
+    """The session's versioned dataset store."""
+    if "dataset" not in st.session_state:
+        st.session_state.dataset = DatasetStore(st.session_state.get("history_depth", DEFAULT_HISTORY_DEPTH))
+    return st.session_state.dataset
+
+def current_dataframe():
+    return dataset_store().current
+
+def dataframe_version():
+    return dataset_store().version
+
+def set_dataframe(df, memory_bytes=None, label=None, steps=None, recipe=None):
+    """Commit df as the new dataset version; unchanged columns are shared with the previous one."""
+    return dataset_store().commit(df, label=label, memory_bytes=memory_bytes, steps=steps, recipe=recipe)
+
+def current_out_of_core():
+    """The session's out-of-core dataset, or None."""
+    history = st.session_state.get("out_of_core_history", [])
+    return history[-1] if history else None
+
+def set_out_of_core(dataset, keep=2):
+    """Make dataset current, keeping the last few for undo; older partitions are removed from disk."""
+    history = st.session_state.setdefault("out_of_core_history", [])
+    history.append(dataset)
+    while len(history) > keep:
+        history.pop(0).remove()
+
+def undo_out_of_core():
+    history = st.session_state.get("out_of_core_history", [])
+    if len(history) > 1:
+        history.pop().remove()
+
+def dataframe_memory():
+    """Deep memory usage of the session dataset, computed once per version."""
+    return dataset_store().memory_usage()
+
+def history_controls(key):
+    """Undo/redo buttons and history depth for the dataset store."""
+    store = dataset_store()
+    col1, col2, col3 = st.columns([1, 1, 3])
+    with col1:
+        if st.button("Undo", key=f"undo_{key}", disabled=not store.can_undo):
+            store.undo()
+            st.session_state.preview_op = None
+            st.rerun()
+    with col2:
+        if st.button("Redo", key=f"redo_{key}", disabled=not store.can_redo):
+            store.redo()
+            st.session_state.preview_op = None
+            st.rerun()
+    with col3:
+        with st.expander("History"):
+            depth = st.number_input(
+                "Undo steps to keep", min_value=0, max_value=100,
+                value=store.max_history, key=f"history_depth_{key}",
+            )
+            if depth != store.max_history:
+                store.set_history_depth(depth)
+                st.session_state.history_depth = depth
+            for version, label, shape in store.history():
+                marker = "▶ " if version == store.version else ""
+                st.write(f"{marker}v{version} · {label or 'Dataset'} · {shape[0]:,} × {shape[1]}")
 
 def safe_display_dataframe(df, key=None, **kwargs):
     """Safely display DataFrame in Streamlit with enhanced error handling"""
@@ -133,27 +163,196 @@ def safe_display_dataframe(df, key=None, **kwargs):
             st.write("Data preview (text format):")
             st.text(str(df.head()))
 
-def safe_excel_export(df, filename="processed_dataset.xlsx"):
+def _encode_window(df, rows, cols):
+    window = enhanced_sanitize_dataframe_for_streamlit(df.iloc[rows[0]:rows[1], cols[0]:cols[1]])
+    try:
+        import pyarrow as pa
+        return pa.Table.from_pandas(window)
+    except Exception:
+        return window
+
+def paginated_display_dataframe(df, key, version=None):
     """
-    Safely export DataFrame to Excel with fallback options.
+    Display one page of rows and columns, sanitizing and Arrow-encoding only
+    that window. Pages of a versioned dataset are cached and reused.
     """
+    if df is None:
+        return
+    n_rows, n_cols = df.shape
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox("Rows per page", PREVIEW_PAGE_SIZES, index=1, key=f"{key}_page_size")
+    n_pages = max(1, -(-n_rows // page_size))
+    if st.session_state.get(f"{key}_page", 1) > n_pages:
+        st.session_state[f"{key}_page"] = n_pages
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, key=f"{key}_page")
+    col_window = (0, n_cols)
+    if n_cols > PREVIEW_MAX_COLUMNS:
+        if st.session_state.get(f"{key}_first_col", 1) > n_cols:
+            st.session_state[f"{key}_first_col"] = 1
+        with col3:
+            first_col = st.number_input(
+                "First column", min_value=1, max_value=n_cols, value=1,
+                step=PREVIEW_MAX_COLUMNS, key=f"{key}_first_col",
+            )
+        col_window = (first_col - 1, min(first_col - 1 + PREVIEW_MAX_COLUMNS, n_cols))
+
+    row_window = ((page - 1) * page_size, min(page * page_size, n_rows))
     try:
-        from io import BytesIO
-        
-        # Try to import openpyxl
-        try:
-            import openpyxl
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Processed Data', index=False)
-            return output.getvalue(), "xlsx", " Download as Excel"
-        except ImportError:
-            # Fallback to CSV if openpyxl not available
-            csv_data = df.to_csv(index=False).encode('utf-8')
-            return csv_data, "csv", " Download as CSV (Excel not available)"
+        if version is None:
+            encoded = _encode_window(df, row_window, col_window)
+        else:
+            cache_key = (version, row_window, col_window)
+            encoded = PREVIEW_CACHE.get(cache_key)
+            if encoded is None:
+                encoded = PREVIEW_CACHE.put(cache_key, _encode_window(df, row_window, col_window))
+        st.dataframe(encoded)
     except Exception as e:
-        # Ultimate fallback
-        csv_data = df.to_csv(index=False).encode('utf-8')
-        return csv_data, "csv", "Download as CSV (Error occurred)"
+        st.error(f"Error displaying data: {str(e)}")
+        st.text(str(df.iloc[row_window[0]:row_window[1]].head()))
+    st.caption(
+        f"Rows {row_window[0] + 1:,}–{row_window[1]:,} of {n_rows:,} · "
+        f"columns {col_window[0] + 1}–{col_window[1]} of {n_cols}"
+    )
+
+LAZY_SAMPLE_ROWS = 1000
+
+def apply_operation(step):
+    """
+    Apply a recorded step to the dataset and commit the result. In lazy mode
+    the step is only added to the pending plan; returns None in that case.
+    """
+    from recipe import apply_step
+    if st.session_state.get("lazy_mode"):
+        st.session_state.pending_steps = st.session_state.get("pending_steps", []) + [step]
+        return None
+    df_result = enhanced_sanitize_dataframe_for_streamlit(apply_step(current_dataframe(), step))
+    set_dataframe(df_result, label=step["op"].strip(), steps=[step])
+    return df_result
+
+def plan_preview():
+    """The pending plan run on a leading sample of the dataset."""
+    from recipe import run_recipe
+    # Reruns on every render, so it would flood the performance panel
+    with perf.paused():
+        return run_recipe(current_dataframe().head(LAZY_SAMPLE_ROWS), st.session_state.get("pending_steps", []))
+
+def operation_preview(op_group, op_label):
+    """Paginated preview shown under an operation after it was applied."""
+    preview = st.session_state.get("preview_op")
+    if not preview or tuple(preview[:2]) != (op_group, op_label):
+        return
+    key = f"preview_{op_group}_{op_label}"
+    if preview[2] == "result":
+        st.subheader("Result Preview")
+        paginated_display_dataframe(st.session_state.get("last_result"), key=key)
+    elif preview[2] == "plan":
+        if not st.session_state.get("pending_steps"):
+            return
+        st.subheader(f"Plan Preview (first {LAZY_SAMPLE_ROWS:,} rows)")
+        try:
+            paginated_display_dataframe(plan_preview(), key=key)
+        except Exception as e:
+            st.error(f"Error previewing plan: {str(e)}")
+    else:
+        st.subheader("Updated Data Preview")
+        paginated_display_dataframe(current_dataframe(), key=key, version=dataframe_version())
+
+def recipe_controls(key):
+    """Lazy mode toggle, pending plan and the recorded recipe of the dataset."""
+    from recipe import run_recipe, describe_step, recipe_to_json, recipe_from_json
+    store = dataset_store()
+    st.toggle(
+        "Lazy mode: stage operations, preview them on a sample and run the plan once on commit",
+        key="lazy_mode",
+    )
+    pending = st.session_state.get("pending_steps", [])
+    if pending:
+        st.write(f"**Pending plan ({len(pending)} steps)**")
+        for idx, step in enumerate(pending, 1):
+            st.write(f"{idx}. {describe_step(step)}")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Commit plan", key=f"commit_plan_{key}"):
+                try:
+                    with st.spinner(f"Running {len(pending)} steps on the full dataset..."):
+                        df_result = run_recipe(current_dataframe(), pending)
+                    set_dataframe(df_result, label=f"Plan ({len(pending)} steps)", steps=pending)
+                    st.session_state.pending_steps = []
+                    st.session_state.preview_op = None
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error running plan: {str(e)}")
+        with col2:
+            if st.button("Discard plan", key=f"discard_plan_{key}"):
+                st.session_state.pending_steps = []
+                st.session_state.preview_op = None
+                st.rerun()
+
+    with st.expander(f"Recipe ({len(store.recipe)} steps)"):
+        for idx, step in enumerate(store.recipe, 1):
+            st.write(f"{idx}. {describe_step(step)}")
+        st.download_button(
+            label="Download recipe",
+            data=recipe_to_json(store.recipe),
+            file_name="recipe.json",
+            mime="application/json",
+            key=f"download_recipe_{key}",
+        )
+        recipe_file = st.file_uploader("Apply a saved recipe", type=["json"], key=f"recipe_file_{key}")
+        if recipe_file is not None and st.button("Apply recipe", key=f"apply_recipe_{key}"):
+            try:
+                steps = recipe_from_json(recipe_file.getvalue().decode("utf-8"))
+                with st.spinner(f"Running {len(steps)} steps..."):
+                    df_result = run_recipe(current_dataframe(), steps)
+                set_dataframe(df_result, label=f"Recipe ({len(steps)} steps)", steps=steps)
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error applying recipe: {str(e)}")
+
+def approximate_toggle(operations, key):
+    """Page-wide switch for ops that can answer from sketches; False when no op on the page can."""
+    from recipe import op_params
+    if not any(op_params(func, approximate=True) for func in operations.values()):
+        return False
+    return st.toggle(
+        "Approximate statistics (sketches with error bounds, faster on very large columns)",
+        value=False,
+        key=f"approximate_{key}",
+    )
+
 
-    pass
+def perf_panel(key):
+    """Collapsible table of recorded timings with export and reset."""
+    records = st.session_state.get("perf_records", [])
+    with st.expander(f"Performance ({len(records)} records)"):
+        st.toggle(
+            "Trace peak memory (adds overhead to every measured call)",
+            value=False,
+            key="perf_trace_memory",
+        )
+        if not records:
+            st.caption("Apply an operation or generate a chart to record its timing.")
+            return
+        table = pd.DataFrame(records[::-1])
+        columns = ["timestamp", "kind", "name", "wall_ms", "sanitize_ms", "peak_mb", "input_shape", "output_shape"]
+        if "error" in table.columns:
+            columns.append("error")
+        table = table[[col for col in columns if col in table.columns]]
+        for col in ("input_shape", "output_shape"):
+            table[col] = table[col].map(lambda shape: " × ".join(map(str, shape)) if isinstance(shape, list) else "")
+        safe_display_dataframe(table, key=f"perf_table_{key}")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                label="Download JSONL",
+                data=perf.records_to_jsonl(records),
+                file_name="performance.jsonl",
+                mime="application/x-ndjson",
+                key=f"download_perf_{key}",
+            )
+        with col2:
+            if st.button("Clear", key=f"clear_perf_{key}"):
+                records.clear()
+                st.rerun()